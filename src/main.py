@@ -4,10 +4,14 @@ import stat
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, request
 from flask_cors import CORS
 from src.models import db, Question, SimulationSession
 from src.routes import user_bp, simulation_bp
+from src.services import StaticAssetManifest, results_cache, cache, search_index, db_tuning
+from src.services.submission_queue import submission_queue
+from src.services.group_commit import session_inserts
+from src.services.question_snapshot import snapshot_uri
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -22,6 +26,14 @@ app.register_blueprint(simulation_bp, url_prefix='/api')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Banco de questões: snapshot pré-construído aberto como read-only, ou o próprio app.db.
+# Sessões, usuários e exposições continuam no banco gravável.
+app.config['QUESTION_BANK_SNAPSHOT'] = os.environ.get('QUESTION_BANK_SNAPSHOT')
+app.config['SQLALCHEMY_BINDS'] = {
+    'questions': snapshot_uri(app.config['QUESTION_BANK_SNAPSHOT'])
+    if app.config['QUESTION_BANK_SNAPSHOT'] else app.config['SQLALCHEMY_DATABASE_URI']
+}
+
 # Ensure database directory exists and has proper permissions
 db_dir = os.path.join(os.path.dirname(__file__), 'database')
 db_path = os.path.join(db_dir, 'app.db')
@@ -37,9 +49,29 @@ try:
 except PermissionError:
     print("Warning: Could not set database permissions")
 
+# Cache em disco dos resultados de simulados concluídos, limitado em bytes
+app.config['RESULTS_CACHE_DIR'] = os.path.join(db_dir, 'results_cache')
+app.config['RESULTS_CACHE_MAX_BYTES'] = int(os.environ.get('RESULTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+results_cache.init_app(app)
+
+# Backend compartilhado (L2) do cache: CACHE_BACKEND=redis://host:6379/0 ou memory
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND')
+# Segredo comum a todos os workers para assinar os valores do L2
+app.config['CACHE_SIGNING_KEY'] = os.environ.get('CACHE_SIGNING_KEY')
+cache.init_app(app)
+
 db.init_app(app)
+# Pragmas por bind: WAL no banco gravável, mmap/cache no banco de questões
+db_tuning.init_app(app)
 with app.app_context():
-    db.create_all()
+    if app.config['QUESTION_BANK_SNAPSHOT']:
+        # O snapshot já traz tabelas, índices e busca textual prontos
+        db.create_all(bind_key=None)
+    else:
+        db.create_all()
+        # Índice de busca textual (FTS5) mantido por triggers na tabela questions
+        if not search_index.ensure_index():
+            print("Warning: Full-text search index unavailable")
     # Ensure database file has proper permissions after creation
     if os.path.exists(db_path):
         try:
@@ -47,22 +79,34 @@ with app.app_context():
         except PermissionError:
             print("Warning: Could not set database file permissions")
 
+# Submissões em write-behind (SUBMISSION_WRITE_BEHIND=1): journal local reaplicado na inicialização
+app.config['SUBMISSION_WRITE_BEHIND'] = os.environ.get('SUBMISSION_WRITE_BEHIND') == '1'
+# Um journal por processo neste diretório; os de processos que morreram são reaplicados
+app.config['SUBMISSION_JOURNAL_DIR'] = os.environ.get('SUBMISSION_JOURNAL_DIR', os.path.join(db_dir, 'journals'))
+submission_queue.init_app(app)
+
+# Janela (s) do group commit de novas sessões; 0 grava cada sessão na própria transação
+app.config['SESSION_GROUP_COMMIT_WINDOW'] = float(os.environ.get('SESSION_GROUP_COMMIT_WINDOW', 0.002))
+session_inserts.init_app(app)
+
+# Manifesto dos arquivos estáticos, construído uma única vez na inicialização
+static_assets = StaticAssetManifest(app.static_folder)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    asset = static_assets.get(path) if path != "" else None
+    if asset is None:
+        # Fallback da SPA servido da memória
+        asset = static_assets.index
+        if asset is None:
             return "index.html not found", 404
 
+    return static_assets.send(asset, request)
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
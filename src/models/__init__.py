@@ -5,6 +5,13 @@ This package contains all database models and related functionality.
 """
 
 from .user import User, db
-from .question import Question, SimulationSession
+from .question import (
+    Question, SimulationSession, QuestionExposure, SeedManifest, SessionAnswer, SessionDomainScore,
+    QuestionCalibration, CalibratedSession, CalibrationRun, ScoreHistogramBin
+)
 
-__all__ = ['User', 'Question', 'SimulationSession', 'db']
+__all__ = [
+    'User', 'Question', 'SimulationSession', 'QuestionExposure', 'SeedManifest', 'SessionAnswer',
+    'SessionDomainScore', 'QuestionCalibration', 'CalibratedSession', 'CalibrationRun', 'ScoreHistogramBin',
+    'db'
+]
@@ -4,15 +4,18 @@ import json
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __bind_key__ = 'questions'  # banco de questões, que pode ser um snapshot read-only
     
     id = db.Column(db.Integer, primary_key=True)
     certification = db.Column(db.String(50), nullable=False)  # CLF-C02, AIF-C01, SAA-C03, SAP-C02
     domain = db.Column(db.String(100), nullable=False)
-    question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), nullable=False)  # multiple_choice, multiple_response
-    options = db.Column(db.Text, nullable=False)  # JSON string
-    correct_answers = db.Column(db.Text, nullable=False)  # JSON string
-    explanation = db.Column(db.Text, nullable=False)
+    # Colunas grandes em grupos adiados: carregadas só quando acessadas ou pedidas
+    # na consulta com undefer_group('content') / undefer_group('answer_key')
+    question_text = db.deferred(db.Column(db.Text, nullable=False), group='content')
+    options = db.deferred(db.Column(db.Text, nullable=False), group='content')  # JSON string
+    correct_answers = db.deferred(db.Column(db.Text, nullable=False), group='answer_key')  # JSON string
+    explanation = db.deferred(db.Column(db.Text, nullable=False), group='answer_key')
     difficulty = db.Column(db.String(20), default='medium')  # easy, medium, hard
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -68,3 +71,128 @@ class SimulationSession(db.Model):
             'questions_data': json.loads(self.questions_data) if self.questions_data else []
         }
 
+
+class QuestionExposure(db.Model):
+    __tablename__ = 'question_exposures'
+    __table_args__ = (
+        db.UniqueConstraint('user_name', 'certification', name='uq_question_exposures_user_cert'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_name = db.Column(db.String(100), nullable=False)
+    certification = db.Column(db.String(50), nullable=False)
+    base_id = db.Column(db.Integer, nullable=False, default=0)  # ID da questão representada pelo bit 0
+    seen = db.Column(db.LargeBinary, nullable=False, default=b'')  # bitset little-endian
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SeedManifest(db.Model):
+    __tablename__ = 'seed_manifest'
+    __bind_key__ = 'questions'
+    __table_args__ = (
+        db.UniqueConstraint('source', 'certification', name='uq_seed_manifest_source_cert'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(100), nullable=False)  # função geradora ou pack:<arquivo>
+    certification = db.Column(db.String(50), nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+    entries = db.Column(db.Text, nullable=False, default='{}')  # JSON {hash do texto: checksum da questão}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SessionAnswer(db.Model):
+    __tablename__ = 'session_answers'
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'position', name='uq_session_answers_session_position'),
+        db.Index('ix_session_answers_session_correct', 'session_id', 'is_correct', 'position'),
+        db.Index('ix_session_answers_session_domain', 'session_id', 'domain', 'position'),
+        # Ids nunca reutilizados: uma ressubmissão regrava as respostas acima da marca d'água da calibração
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # índice da questão no simulado
+    question_id = db.Column(db.Integer, nullable=False)
+    domain = db.Column(db.String(100), nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False)
+    user_answer = db.Column(db.Text, nullable=False)  # JSON string
+
+
+class SessionDomainScore(db.Model):
+    __tablename__ = 'session_domain_scores'
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'domain', name='uq_session_domain_scores_session_domain'),
+        db.Index('ix_session_domain_scores_cert_domain', 'certification', 'domain'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    certification = db.Column(db.String(50), nullable=False)
+    domain = db.Column(db.String(100), nullable=False)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class QuestionCalibration(db.Model):
+    __tablename__ = 'question_calibrations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, nullable=False, unique=True)
+    certification = db.Column(db.String(50), nullable=False, index=True)
+    # Estatísticas suficientes, acumuladas a cada execução incremental
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    sum_rest = db.Column(db.Float, nullable=False, default=0.0)  # escore do restante da prova (0-1)
+    sum_rest_sq = db.Column(db.Float, nullable=False, default=0.0)
+    sum_correct_rest = db.Column(db.Float, nullable=False, default=0.0)
+    # Valores derivados
+    p_value = db.Column(db.Float, nullable=True)
+    discrimination = db.Column(db.Float, nullable=True)  # correlação ponto-bisserial item-resto
+    calibrated_difficulty = db.Column(db.String(20), nullable=True)  # easy, medium, hard
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'certification': self.certification,
+            'responses': self.responses,
+            'p_value': self.p_value,
+            'discrimination': self.discrimination,
+            'calibrated_difficulty': self.calibrated_difficulty
+        }
+
+
+class CalibratedSession(db.Model):
+    __tablename__ = 'calibrated_sessions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False, unique=True)
+    completed_at = db.Column(db.DateTime, nullable=False)  # versão da submissão somada à calibração
+    answers = db.Column(db.Text, nullable=False, default='[]')  # JSON [[question_id, acerto, escore do restante]]
+
+
+class CalibrationRun(db.Model):
+    __tablename__ = 'calibration_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Marca d'água no início; única, então duas execuções concorrentes não gravam a mesma faixa
+    previous_answer_id = db.Column(db.Integer, nullable=False, unique=True)
+    last_answer_id = db.Column(db.Integer, nullable=False)  # marca d'água em session_answers.id
+    answers_processed = db.Column(db.Integer, nullable=False, default=0)
+    questions_updated = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+class ScoreHistogramBin(db.Model):
+    __tablename__ = 'score_histograms'
+    __table_args__ = (
+        db.UniqueConstraint('certification', 'score', name='uq_score_histograms_cert_score'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    certification = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Integer, nullable=False)  # ponto da escala 0-1000
+    count = db.Column(db.Integer, nullable=False, default=0)  # sessões concluídas com essa nota
@@ -1,13 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models.user import db
-from src.models.question import Question, SimulationSession
+from src.models.question import Question, SimulationSession, QuestionCalibration
+from src.services.exam_composer import exam_composer, InsufficientQuestionsError
+from src.services.exposure_index import exposure_index
+from src.services.results_cache import results_cache
+from src.services.submission_queue import submission_queue, SubmissionQueueFull
+from src.services.session_answers import answer_keys
+from src.services.group_commit import session_inserts
+from src.services.compact_payload import exam_response
+from src.services.cohort_analytics import cohort_analytics, PERIODS
+from src.services.score_histogram import score_histograms
+from src.services.cache import cached, route_cache
+from src.services.question_import import BulkImporter, DEFAULT_CHUNK_SIZE, iter_json_array, iter_ndjson
+from src.services import search_index, near_duplicates, session_answers, domain_scores, calibration, adaptive, score_histogram
+from sqlalchemy.orm import undefer_group
 from datetime import datetime
 import json
-import random
+import math
 
 simulation_bp = Blueprint('simulation', __name__)
 
 @simulation_bp.route('/certifications', methods=['GET'])
+@cached(ttl=3600, tags=('catalog',))
 def get_certifications():
     """Retorna lista de certificações disponíveis"""
     certifications = [
@@ -47,11 +61,63 @@ def get_certifications():
     return jsonify(certifications)
 
 @simulation_bp.route('/questions/<certification>', methods=['GET'])
+@cached(tags=('questions:{certification}',))
 def get_questions_by_certification(certification):
     """Retorna questões por certificação"""
-    questions = Question.query.filter_by(certification=certification).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(certification=certification).all()
     return jsonify([q.to_dict_without_answers() for q in questions])
 
+@simulation_bp.route('/questions/search', methods=['GET'])
+def search_questions():
+    """Busca questões por texto, ordenadas por relevância"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+    
+    try:
+        results = search_index.search(
+            query,
+            certification=request.args.get('certification'),
+            domain=request.args.get('domain'),
+            difficulty=request.args.get('difficulty'),
+            limit=request.args.get('limit', 20, type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+    except search_index.SearchUnavailableError:
+        return jsonify({'error': 'Busca textual indisponível'}), 503
+    
+    return jsonify({'query': query, 'count': len(results), 'results': results})
+
+@simulation_bp.route('/questions/<certification>/duplicates', methods=['GET'])
+@cached(ttl=3600, tags=('questions:{certification}',))
+def get_duplicate_questions(certification):
+    """Relatório de clusters de questões quase duplicadas"""
+    threshold = request.args.get('threshold', near_duplicates.DEFAULT_THRESHOLD, type=float)
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold deve estar entre 0 e 1'}), 400
+    
+    index = near_duplicates.build_index(certification, threshold)
+    texts = dict(db.session.query(Question.id, Question.question_text).filter(
+        Question.id.in_(index.cluster_of)
+    ))
+    
+    clusters = [
+        {
+            'cluster_id': members[0],
+            'size': len(members),
+            'questions': [{'id': question_id, 'question_text': texts.get(question_id)} for question_id in members]
+        }
+        for members in index.clusters
+    ]
+    
+    return jsonify({
+        'certification': certification,
+        'threshold': threshold,
+        'total_questions': len(index.signatures),
+        'duplicated_questions': len(index.cluster_of),
+        'clusters': clusters
+    })
+
 @simulation_bp.route('/simulation/start', methods=['POST'])
 def start_simulation():
     """Inicia um novo simulado"""
@@ -59,44 +125,209 @@ def start_simulation():
     certification = data.get('certification')
     user_name = data.get('user_name', 'Anônimo')
     num_questions = data.get('num_questions', 65)
-    
-    # Busca questões aleatórias da certificação
-    all_questions = Question.query.filter_by(certification=certification).all()
-    
-    if len(all_questions) < num_questions:
+    domain_weights = data.get('domain_weights')
+    difficulty_mix = data.get('difficulty_mix')
+    distinct_clusters = bool(data.get('distinct_clusters', False))
+    
+    if data.get('mode') == 'adaptive':
+        return _start_adaptive(certification, user_name, data.get('max_questions', adaptive.DEFAULT_MAX_ITEMS))
+    
+    if not isinstance(domain_weights, (dict, type(None))) or not isinstance(difficulty_mix, (dict, type(None))):
+        return jsonify({'error': 'domain_weights e difficulty_mix devem ser objetos'}), 400
+    weights = list((domain_weights or {}).values()) + list((difficulty_mix or {}).values())
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 for value in weights):
+        return jsonify({'error': 'Os pesos de domain_weights e difficulty_mix devem ser números não negativos'}), 400
+    
+    # Sorteia as questões estratificadas por domínio e dificuldade
+    try:
+        question_ids = exam_composer.compose(
+            certification,
+            num_questions,
+            domain_weights=domain_weights,
+            difficulty_mix=difficulty_mix,
+            seen=exposure_index.seen(user_name, certification),
+            clusters=near_duplicates.cluster_map(certification) if distinct_clusters else None
+        )
+    except InsufficientQuestionsError:
+        if distinct_clusters:
+            return jsonify({'error': 'Não há questões distintas (sem quase duplicadas) suficientes para esta certificação'}), 400
         return jsonify({'error': 'Não há questões suficientes para esta certificação'}), 400
     
-    # Seleciona questões aleatórias
-    selected_questions = random.sample(all_questions, num_questions)
+    # Só as colunas exibidas: o gabarito e a explicação não são carregados
+    questions_by_id = {
+        q.id: q for q in Question.query.options(undefer_group('content')).filter(Question.id.in_(question_ids))
+    }
+    selected_questions = [questions_by_id[question_id] for question_id in question_ids]
     
-    # Cria sessão de simulado
-    session = SimulationSession(
-        certification=certification,
-        user_name=user_name,
-        total_questions=num_questions,
-        questions_data=json.dumps([q.id for q in selected_questions])
+    # Cria sessão de simulado; inícios simultâneos são gravados numa única transação
+    session_id = session_inserts.insert(
+        {
+            'certification': certification,
+            'user_name': user_name,
+            'total_questions': num_questions,
+            'questions_data': json.dumps([q.id for q in selected_questions])
+        },
+        # Registra as questões servidas no histórico do usuário, na mesma transação
+        after=lambda: exposure_index.record(user_name, certification, question_ids)
     )
-    
-    db.session.add(session)
-    db.session.commit()
+    route_cache.invalidate_tag(f'sessions:{certification}')
     
     # Retorna questões sem as respostas corretas
     questions_data = [q.to_dict_without_answers() for q in selected_questions]
     
-    return jsonify({
-        'session_id': session.id,
+    # Formato compacto (colunar) quando o cliente o pede no Accept
+    return exam_response({
+        'session_id': session_id,
         'questions': questions_data,
         'certification': certification,
         'total_questions': num_questions
     })
 
+def _start_adaptive(certification, user_name, max_questions):
+    """Inicia um simulado adaptativo: só a primeira questão é escolhida agora"""
+    if not isinstance(max_questions, int) or max_questions < adaptive.MIN_ITEMS:
+        return jsonify({'error': f'max_questions deve ser um inteiro >= {adaptive.MIN_ITEMS}'}), 400
+    
+    bank = adaptive.item_bank(certification)
+    if len(bank) < adaptive.MIN_ITEMS:
+        return jsonify({'error': 'Não há questões suficientes para esta certificação'}), 400
+    
+    # Sem respostas ainda, a estimativa de habilidade é a média da priori
+    first = bank.next_item(0.0, [])
+    state = {
+        'mode': 'adaptive',
+        'question_ids': [first.question_id],
+        'answers': [],
+        'log_posterior': adaptive.PRIOR,
+        'max_questions': max_questions
+    }
+    session_id = session_inserts.insert({
+        'certification': certification,
+        'user_name': user_name,
+        'total_questions': max_questions,
+        'questions_data': json.dumps(state)
+    })
+    route_cache.invalidate_tag(f'sessions:{certification}')
+    
+    question = Question.query.options(undefer_group('content')).get(first.question_id)
+    return jsonify({
+        'session_id': session_id,
+        'mode': 'adaptive',
+        'certification': certification,
+        'max_questions': max_questions,
+        'position': 0,
+        'question': question.to_dict_without_answers()
+    })
+
+@simulation_bp.route('/simulation/<int:session_id>/next', methods=['POST'])
+def next_question(session_id):
+    """Corrige a resposta da questão atual de um simulado adaptativo e escolhe a próxima"""
+    data = request.get_json() or {}
+    user_answer = data.get('answer', [])
+    time_taken = data.get('time_taken', 0)
+    if not isinstance(user_answer, list):
+        return jsonify({'error': 'answer deve ser uma lista de alternativas'}), 400
+    
+    session = SimulationSession.query.get_or_404(session_id)
+    if session.completed_at:
+        return jsonify({'error': 'Simulado já foi concluído'}), 400
+    
+    state = json.loads(session.questions_data)
+    if not isinstance(state, dict) or state.get('mode') != 'adaptive':
+        return jsonify({'error': 'Simulado não é adaptativo'}), 400
+    
+    bank = adaptive.item_bank(session.certification)
+    keys = answer_keys(session.certification)
+    question_ids = state['question_ids']
+    current_id = question_ids[len(state['answers'])]
+    
+    key = keys.get(current_id)
+    is_correct = key is not None and set(user_answer) == set(key['correct_answers'])
+    item = bank.items.get(current_id)
+    if item is not None:
+        # Questões removidas do banco depois de servidas não alteram a estimativa
+        state['log_posterior'] = adaptive.update_posterior(state['log_posterior'], item, is_correct)
+    state['answers'].append(user_answer)
+    
+    ability, standard_error = adaptive.estimate(state['log_posterior'])
+    answered = len(state['answers'])
+    progress = {
+        'session_id': session_id,
+        'answered': answered,
+        'ability': round(ability, 3),
+        'standard_error': round(standard_error, 3)
+    }
+    
+    following = None
+    if not adaptive.should_stop(answered, standard_error, state['max_questions']):
+        following = bank.next_item(ability, question_ids)
+    
+    if following is not None:
+        question_ids.append(following.question_id)
+        session.questions_data = json.dumps(state)
+        db.session.commit()
+        question = Question.query.options(undefer_group('content')).get(following.question_id)
+        return jsonify(dict(progress, finished=False, position=answered, question=question.to_dict_without_answers()))
+    
+    # Fim do teste: erro-padrão baixo o bastante, limite de questões ou banco esgotado
+    question_ids = question_ids[:answered]
+    correct_count, detailed_results, answer_rows = _grade(session_id, question_ids, state['answers'], keys)
+    scaled_score = adaptive.scaled_score(ability)
+    
+    session.correct_answers = correct_count
+    session.total_questions = answered
+    session.score = scaled_score
+    session.time_taken = time_taken
+    session.completed_at = datetime.utcnow()
+    session.questions_data = json.dumps({
+        'mode': 'adaptive',
+        'ability': progress['ability'],
+        'standard_error': progress['standard_error'],
+        'question_ids': question_ids,
+        'detailed_results': detailed_results
+    })
+    session_answers.store([session_id], answer_rows)
+    domain_scores.store([session_id], domain_scores.domain_rows(
+        session_id, session.certification, ((row['domain'], row['is_correct']) for row in answer_rows)
+    ))
+    histogram_rows = score_histogram.deltas(session.certification, scaled_score)
+    score_histogram.apply(histogram_rows)
+    # Registra as questões servidas no histórico do usuário
+    exposure_index.record(session.user_name, session.certification, question_ids)
+    db.session.commit()
+    route_cache.invalidate_tag(f'sessions:{session.certification}')
+    score_histograms.record(histogram_rows)
+    
+    results_cache.put(session_id, session.completed_at, _build_results_payload(session, detailed_results))
+    
+    cert_info = {
+        'CLF-C02': 700,
+        'AIF-C01': 700,
+        'SAA-C03': 720,
+        'SAP-C02': 750
+    }
+    
+    passing_score = cert_info.get(session.certification, 700)
+    
+    return jsonify(dict(
+        progress,
+        finished=True,
+        score=scaled_score,
+        correct_answers=correct_count,
+        total_questions=answered,
+        passed=scaled_score >= passing_score,
+        passing_score=passing_score,
+        percentile_rank=score_histograms.percentile_rank(session.certification, scaled_score),
+        time_taken=time_taken
+    ))
+
 @simulation_bp.route('/simulation/<int:session_id>', methods=['GET'])
 def get_simulation(session_id):
     """Retorna dados de um simulado em andamento"""
     session = SimulationSession.query.get_or_404(session_id)
     
     # Se já foi completado, redireciona para resultados
-    if session.completed_at:
+    if session.completed_at or submission_queue.is_pending(session_id):
         return jsonify({'error': 'Simulado já foi concluído'}), 400
     
     # Carrega os IDs das questões
@@ -117,12 +348,14 @@ def get_simulation(session_id):
     else:
         return jsonify({'error': 'Formato de dados de questões inválido'}), 400
     
-    # Busca as questões
-    questions = []
-    for question_id in question_ids:
-        question = Question.query.get(question_id)
-        if question:
-            questions.append(question.to_dict_without_answers())
+    # Busca as questões numa única consulta, sem gabarito nem explicação
+    questions_by_id = {
+        q.id: q for q in Question.query.options(undefer_group('content')).filter(Question.id.in_(question_ids))
+    }
+    questions = [
+        questions_by_id[question_id].to_dict_without_answers()
+        for question_id in question_ids if question_id in questions_by_id
+    ]
     
     # Busca informações da certificação para pegar a duração
     cert_info = {
@@ -145,7 +378,7 @@ def get_simulation(session_id):
         'started_at': session.started_at.isoformat() if session.started_at else None
     }
     
-    return jsonify({
+    return exam_response({
         'simulation': simulation_data,
         'questions': questions
     })
@@ -160,6 +393,10 @@ def submit_simulation(session_id):
     session = SimulationSession.query.get_or_404(session_id)
     questions_data_raw = json.loads(session.questions_data)
     
+    # Simulados adaptativos são respondidos questão a questão em /next
+    if isinstance(questions_data_raw, dict) and questions_data_raw.get('mode') == 'adaptive':
+        return jsonify({'error': 'Simulado adaptativo: envie as respostas em /simulation/<id>/next'}), 400
+    
     # Verifica se é o formato novo (com question_ids e detailed_results) ou antigo (só IDs)
     if isinstance(questions_data_raw, dict) and 'question_ids' in questions_data_raw:
         # Formato novo: já foi submetido antes
@@ -175,52 +412,67 @@ def submit_simulation(session_id):
     else:
         return jsonify({'error': 'Formato de dados de questões inválido'}), 400
     
-    correct_count = 0
-    detailed_results = []
-    
-    # Itera sobre as questões usando o índice para mapear as respostas do frontend
-    for index, question_id in enumerate(question_ids):
-        question = Question.query.get(question_id)
-        if question is None:
-            continue
-            
-        # Frontend envia respostas usando índice da questão (0, 1, 2, etc.)
-        user_answer = answers.get(str(index), [])
-        correct_answers = json.loads(question.correct_answers)
-        
-        is_correct = set(user_answer) == set(correct_answers)
-        if is_correct:
-            correct_count += 1
-            
-        detailed_results.append({
-            'question_id': question_id,
-            'question_text': question.question_text,
-            'options': json.loads(question.options),
-            'user_answer': user_answer,
-            'correct_answers': correct_answers,
-            'is_correct': is_correct,
-            'explanation': question.explanation,
-            'domain': question.domain
-        })
+    # Gabaritos da certificação em cache: a correção não consulta o banco de questões
+    # Frontend envia respostas usando índice da questão (0, 1, 2, etc.)
+    correct_count, detailed_results, answer_rows = _grade(
+        session_id, question_ids, [answers.get(str(index), []) for index in range(len(question_ids))],
+        answer_keys(session.certification)
+    )
     
     # Calcula pontuação (escala 100-1000)
     percentage = (correct_count / session.total_questions) * 100
     scaled_score = int(100 + (percentage / 100) * 900)
     
-    # Atualiza sessão
-    session.correct_answers = correct_count
-    session.score = scaled_score
-    session.time_taken = time_taken
-    session.completed_at = datetime.utcnow()
-    
     # Preserva a estrutura original: mantém IDs das questões e adiciona os resultados detalhados
     original_questions_data = {
         'question_ids': question_ids,  # IDs originais das questões
         'detailed_results': detailed_results  # Resultados detalhados
     }
-    session.questions_data = json.dumps(original_questions_data)
     
-    db.session.commit()
+    # Acertos por domínio, gravados junto com a sessão para análises por SQL indexado
+    domain_score_rows = domain_scores.domain_rows(
+        session_id, session.certification, ((row['domain'], row['is_correct']) for row in answer_rows)
+    )
+    
+    # Histograma de notas da certificação; uma nova submissão move a nota anterior
+    histogram_rows = score_histogram.deltas(
+        session.certification, scaled_score, session.score if session.completed_at else None
+    )
+    
+    # Atualiza sessão
+    values = {
+        'correct_answers': correct_count,
+        'score': scaled_score,
+        'time_taken': time_taken,
+        'completed_at': datetime.utcnow(),
+        'questions_data': json.dumps(original_questions_data)
+    }
+    
+    if submission_queue.enabled:
+        # Write-behind: a atualização vai para o journal e é gravada em lote pela thread de escrita
+        try:
+            submission_queue.submit(session_id, values, answer_rows, domain_score_rows)
+        except SubmissionQueueFull:
+            response = jsonify({'error': 'Muitas submissões em andamento, tente novamente em instantes'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        score_histograms.record(histogram_rows, committed=False)
+        db.session.expunge(session)
+        for column, value in values.items():
+            setattr(session, column, value)
+    else:
+        for column, value in values.items():
+            setattr(session, column, value)
+        # Respostas por questão, indexadas para a revisão paginada dos resultados
+        session_answers.store([session_id], answer_rows)
+        domain_scores.store([session_id], domain_score_rows)
+        score_histogram.apply(histogram_rows)
+        db.session.commit()
+        route_cache.invalidate_tag(f'sessions:{session.certification}')
+        score_histograms.record(histogram_rows)
+    
+    # Grava a resposta final de resultados uma única vez
+    results_cache.put(session_id, session.completed_at, _build_results_payload(session, detailed_results))
     
     # Determina se passou
     cert_info = {
@@ -241,15 +493,46 @@ def submit_simulation(session_id):
         'total_questions': session.total_questions,
         'passed': passed,
         'passing_score': passing_score,
+        'percentile_rank': score_histograms.percentile_rank(session.certification, scaled_score),
         'time_taken': time_taken,
         'detailed_results': detailed_results
     })
 
-@simulation_bp.route('/simulation/<int:session_id>/results', methods=['GET'])
-def get_simulation_results(session_id):
-    """Retorna resultados detalhados de um simulado"""
-    session = SimulationSession.query.get_or_404(session_id)
+def _grade(session_id, question_ids, user_answers, keys):
+    """Corrige as respostas (na ordem das questões) com os gabaritos da certificação"""
+    correct_count = 0
+    detailed_results = []
+    answer_rows = []
     
+    for index, (question_id, user_answer) in enumerate(zip(question_ids, user_answers)):
+        key = keys.get(question_id)
+        if key is None:
+            continue
+            
+        correct_answers = key['correct_answers']
+        
+        is_correct = set(user_answer) == set(correct_answers)
+        if is_correct:
+            correct_count += 1
+            
+        answer_rows.append(session_answers.answer_row(
+            session_id, index, question_id, key['domain'], is_correct, user_answer
+        ))
+        detailed_results.append({
+            'question_id': question_id,
+            'question_text': key['question_text'],
+            'options': key['options'],
+            'user_answer': user_answer,
+            'correct_answers': correct_answers,
+            'is_correct': is_correct,
+            'explanation': key['explanation'],
+            'domain': key['domain']
+        })
+    
+    return correct_count, detailed_results, answer_rows
+
+def _results_summary(session):
+    """Resumo (sessão, pontuação e acertos) da resposta de resultados"""
     # Busca informações da certificação para pegar passing_score
     cert_info = {
         'CLF-C02': {'duration': 90, 'passing_score': 700},
@@ -274,37 +557,132 @@ def get_simulation_results(session_id):
         'completed_at': session.completed_at.isoformat() if session.completed_at else None
     }
     
-    # Carrega questões com respostas do JSON armazenado
-    questions_data_raw = json.loads(session.questions_data) if session.questions_data else []
-    
-    # Verifica o formato dos dados
-    if isinstance(questions_data_raw, dict) and 'detailed_results' in questions_data_raw:
-        # Formato novo: extrai os resultados detalhados
-        questions_with_answers = questions_data_raw['detailed_results']
-    elif isinstance(questions_data_raw, list) and questions_data_raw and isinstance(questions_data_raw[0], dict):
-        # Formato antigo: os dados já são os resultados detalhados
-        questions_with_answers = questions_data_raw
-    else:
-        # Nenhum resultado encontrado
-        questions_with_answers = []
-    
-    # Renomeia campos para compatibilidade com frontend
-    for q in questions_with_answers:
-        if 'user_answer' in q:
-            q['user_answers'] = q['user_answer']
-    
-    return jsonify({
+    return {
         'simulation': simulation_data,
         'score': session.score,
         'percentage': percentage,
         'correct_count': session.correct_answers,
-        'total_questions': session.total_questions,
-        'questions_with_answers': questions_with_answers
-    })
+        'total_questions': session.total_questions
+    }
+
+def _percentile_rank(session):
+    """Posição atual entre os simulados concluídos da certificação, lida do histograma de notas
+    
+    Calculada a cada resposta, fora do cache de resultados: o histograma muda com novas
+    submissões e com a reconstrução.
+    """
+    pending = submission_queue.pending_values(session.id)
+    if pending:
+        return score_histograms.percentile_rank(session.certification, pending['score'])
+    if session.completed_at:
+        return score_histograms.percentile_rank(session.certification, session.score)
+    return None
+
+def _build_results_payload(session, questions_with_answers=None):
+    """Monta a resposta de resultados de um simulado (sem a posição percentil, que muda)"""
+    if questions_with_answers is None:
+        # Carrega questões com respostas do JSON armazenado
+        questions_data_raw = json.loads(session.questions_data) if session.questions_data else []
+        
+        # Verifica o formato dos dados
+        if isinstance(questions_data_raw, dict) and 'detailed_results' in questions_data_raw:
+            # Formato novo: extrai os resultados detalhados
+            questions_with_answers = questions_data_raw['detailed_results']
+        elif isinstance(questions_data_raw, list) and questions_data_raw and isinstance(questions_data_raw[0], dict):
+            # Formato antigo: os dados já são os resultados detalhados
+            questions_with_answers = questions_data_raw
+        else:
+            # Nenhum resultado encontrado
+            questions_with_answers = []
+    
+    # Renomeia campos para compatibilidade com frontend
+    questions_with_answers = [
+        dict(q, user_answers=q['user_answer']) if 'user_answer' in q else q
+        for q in questions_with_answers
+    ]
+    
+    return dict(
+        _results_summary(session),
+        domain_scores=domain_scores.from_results(questions_with_answers),
+        questions_with_answers=questions_with_answers
+    )
+
+# Parâmetros que ativam a revisão paginada dos resultados
+RESULTS_PAGE_ARGS = ('page', 'per_page', 'only_incorrect', 'domain', 'fields')
+
+@simulation_bp.route('/simulation/<int:session_id>/results', methods=['GET'])
+def get_simulation_results(session_id):
+    """Retorna resultados detalhados de um simulado"""
+    if any(arg in request.args for arg in RESULTS_PAGE_ARGS):
+        return _paged_results(session_id)
+    
+    session = SimulationSession.query.get_or_404(session_id)
+    
+    # Simulados concluídos não mudam: a resposta pronta fica em cache, por sessão e conclusão
+    completed_at = _completed_at(session)
+    if completed_at:
+        cached = results_cache.get(session_id, completed_at)
+        if cached is not None:
+            return results_cache.response(cached, request, percentile_rank=_percentile_rank(session))
+    
+    payload = _build_results_payload(session)
+    
+    if session.completed_at:
+        return results_cache.response(
+            results_cache.put(session_id, session.completed_at, payload), request,
+            percentile_rank=_percentile_rank(session)
+        )
+    
+    return jsonify(dict(payload, percentile_rank=None))
+
+def _completed_at(session):
+    """Conclusão do simulado, incluindo uma submissão ainda na fila de write-behind"""
+    return submission_queue.pending_completed_at(session.id) or session.completed_at
+
+def _paged_results(session_id):
+    """Página de resultados com filtro (incorretas, domínio) e projeção de campos"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', session_answers.DEFAULT_PER_PAGE, type=int), 1),
+                   session_answers.MAX_PER_PAGE)
+    only_incorrect = request.args.get('only_incorrect', '').lower() in ('1', 'true', 'yes')
+    domain = request.args.get('domain')
+    fields = session_answers.RESULT_FIELDS
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        invalid = [field for field in fields if field not in session_answers.RESULT_FIELDS]
+        if invalid:
+            return jsonify({'error': f"Campos inválidos: {', '.join(invalid)}"}), 400
+    
+    session = SimulationSession.query.get_or_404(session_id)
+    filters = {'page': page, 'per_page': per_page, 'only_incorrect': only_incorrect, 'domain': domain, 'fields': fields}
+    
+    if session_answers.has_answers(session_id):
+        summary = dict(_results_summary(session), domain_scores=domain_scores.for_session(session_id))
+        total, items = session_answers.page(session, **filters)
+    else:
+        # Sessões anteriores ao índice de respostas, ou ainda na fila de write-behind
+        completed_at = _completed_at(session)
+        payload = (completed_at and results_cache.load(session_id, completed_at)) or _build_results_payload(session)
+        summary = {key: value for key, value in payload.items() if key != 'questions_with_answers'}
+        summary.setdefault('domain_scores', domain_scores.from_results(payload['questions_with_answers']))
+        total, items = session_answers.page_from_payload(payload['questions_with_answers'], **filters)
+    
+    return jsonify(dict(
+        summary,
+        percentile_rank=_percentile_rank(session),
+        page=page,
+        per_page=per_page,
+        total=total,
+        pages=(total + per_page - 1) // per_page,
+        questions_with_answers=items
+    ))
 
 @simulation_bp.route('/questions', methods=['POST'])
 def add_question():
     """Adiciona uma nova questão"""
+    if current_app.config.get('QUESTION_BANK_SNAPSHOT'):
+        return jsonify({'error': 'Banco de questões é um snapshot somente leitura'}), 409
+    
     data = request.get_json()
     
     question = Question(
@@ -321,12 +699,40 @@ def add_question():
     db.session.add(question)
     db.session.commit()
     
+    # Pools de sorteio, listagens e estatísticas da certificação incluem a nova questão
+    route_cache.invalidate_tag(f'questions:{question.certification}')
+    
     return jsonify({'message': 'Questão adicionada com sucesso', 'id': question.id}), 201
 
+@simulation_bp.route('/questions/bulk', methods=['POST'])
+def bulk_import_questions():
+    """Importa questões em lote a partir de NDJSON ou de um array JSON"""
+    if current_app.config.get('QUESTION_BANK_SNAPSHOT'):
+        return jsonify({'error': 'Banco de questões é um snapshot somente leitura'}), 409
+    
+    chunk_size = max(1, request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int))
+    
+    # O corpo é lido em streaming, sem carregar a requisição inteira na memória
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        records = iter_ndjson(request.stream)
+    else:
+        records = iter_json_array(request.stream)
+    
+    importer = BulkImporter(chunk_size=chunk_size)
+    report = importer.run(records)
+    
+    for certification in importer.certifications:
+        route_cache.invalidate_tag(f'questions:{certification}')
+    
+    return jsonify(report)
+
 @simulation_bp.route('/stats/<certification>', methods=['GET'])
+@cached(ttl=60, tags=('questions:{certification}', 'sessions:{certification}'))
 def get_certification_stats(certification):
     """Retorna estatísticas de uma certificação"""
-    total_questions = Question.query.filter_by(certification=certification).count()
+    total_questions = db.session.query(db.func.count(Question.id)).filter(
+        Question.certification == certification
+    ).scalar()
     total_sessions = SimulationSession.query.filter_by(certification=certification).count()
     completed_sessions = SimulationSession.query.filter_by(certification=certification).filter(
         SimulationSession.completed_at.isnot(None)
@@ -353,3 +759,71 @@ def get_certification_stats(certification):
         'pass_rate': round(pass_rate, 1)
     })
 
+@simulation_bp.route('/stats/<certification>/domains', methods=['GET'])
+@cached(ttl=60, tags=('sessions:{certification}',))
+def get_certification_domain_stats(certification):
+    """Taxa de acerto por domínio em todos os simulados concluídos da certificação"""
+    return jsonify({
+        'certification': certification,
+        'domains': domain_scores.aggregate(certification)
+    })
+
+@simulation_bp.route('/stats/<certification>/analytics', methods=['GET'])
+def get_certification_analytics(certification):
+    """Distribuição de notas, percentis, aprovação ao longo do tempo e histograma de duração"""
+    period = request.args.get('period', 'week')
+    if period not in PERIODS:
+        return jsonify({'error': f"period deve ser um de: {', '.join(PERIODS)}"}), 400
+    score_bins = request.args.get('bins', 18, type=int)
+    time_bin = request.args.get('time_bin', 10, type=int)
+    if not 1 <= score_bins <= 90 or not 1 <= time_bin <= 240:
+        return jsonify({'error': 'bins deve estar entre 1 e 90 e time_bin entre 1 e 240 minutos'}), 400
+    score = request.args.get('score', type=float)
+    if score is not None and not math.isfinite(score):
+        return jsonify({'error': 'score deve ser um número finito'}), 400
+    
+    # Extrato colunar em memória, atualizado só com as sessões novas desde a última consulta
+    return jsonify(cohort_analytics.report(
+        certification,
+        score_bins=score_bins,
+        period=period,
+        time_bin_minutes=time_bin,
+        score=score
+    ))
+
+@simulation_bp.route('/stats/submission-queue', methods=['GET'])
+def get_submission_queue_stats():
+    """Submissões em write-behind ainda não gravadas e descartadas no dead-letter"""
+    return jsonify(submission_queue.stats())
+
+@simulation_bp.route('/stats/score-histograms/rebuild', methods=['POST'])
+def rebuild_score_histograms():
+    """Recalcula os histogramas de notas a partir do histórico de simulados concluídos"""
+    sessions = score_histograms.rebuild()
+    return jsonify({'sessions': sessions})
+
+@simulation_bp.route('/calibration/run', methods=['POST'])
+def run_calibration():
+    """Atualiza a calibração das questões com as respostas recebidas desde a última execução"""
+    try:
+        calibration_run = calibration.run()
+    except calibration.CalibrationInProgress:
+        return jsonify({'error': 'Outra execução da calibração gravou estas respostas; tente novamente'}), 409
+    return jsonify({
+        'last_answer_id': calibration_run.last_answer_id,
+        'answers_processed': calibration_run.answers_processed,
+        'questions_updated': calibration_run.questions_updated
+    })
+
+@simulation_bp.route('/questions/<certification>/calibration', methods=['GET'])
+@cached(ttl=300, tags=('calibration:{certification}',))
+def get_question_calibration(certification):
+    """Estatísticas de item (p-value, discriminação) e dificuldade calibrada"""
+    calibrations = QuestionCalibration.query.filter_by(certification=certification).order_by(
+        QuestionCalibration.question_id
+    ).all()
+    return jsonify({
+        'certification': certification,
+        'min_responses': calibration.MIN_RESPONSES,
+        'questions': [c.to_dict() for c in calibrations]
+    })
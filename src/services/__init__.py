@@ -0,0 +1,55 @@
+"""
+Services package for AWS Simulados API.
+
+This package contains supporting services used by the application and routes.
+"""
+
+from .static_assets import StaticAssetManifest
+from .exam_composer import ExamComposer, InsufficientQuestionsError, exam_composer
+from .exposure_index import ExposureBitset, ExposureIndex, exposure_index
+from .results_cache import ResultsCache, results_cache
+from .cache import TTLCache, TieredCache, cached, route_cache
+from .cache_backends import CacheBackend, InMemoryBackend, RedisBackend
+from .question_import import BulkImporter, normalize_answers
+from .question_pack import QuestionPack, write_pack
+from .question_snapshot import build_snapshot
+from .submission_queue import SubmissionQueue, SubmissionQueueFull, submission_queue
+from .group_commit import GroupCommitter, session_inserts
+from .compact_payload import exam_response
+from .cohort_analytics import CohortAnalytics, cohort_analytics
+from .score_histogram import ScoreHistograms, score_histograms
+from . import cache, search_index, near_duplicates, db_tuning, session_answers, domain_scores, calibration, adaptive
+
+__all__ = [
+    'StaticAssetManifest',
+    'ExamComposer',
+    'InsufficientQuestionsError',
+    'exam_composer',
+    'ExposureBitset',
+    'ExposureIndex',
+    'exposure_index',
+    'ResultsCache',
+    'results_cache',
+    'TTLCache',
+    'TieredCache',
+    'CacheBackend',
+    'InMemoryBackend',
+    'RedisBackend',
+    'BulkImporter',
+    'normalize_answers',
+    'QuestionPack',
+    'write_pack',
+    'build_snapshot',
+    'SubmissionQueue',
+    'SubmissionQueueFull',
+    'submission_queue',
+    'GroupCommitter',
+    'session_inserts',
+    'exam_response',
+    'CohortAnalytics',
+    'cohort_analytics',
+    'ScoreHistograms',
+    'score_histograms',
+    'cached',
+    'route_cache'
+]
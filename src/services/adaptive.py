@@ -0,0 +1,182 @@
+"""
+Computerized adaptive testing with a two-parameter logistic (2PL) IRT model.
+
+Each certification has an in-memory item bank: per domain, the items sorted
+by difficulty ``b``. The next item is the one with maximum Fisher
+information ``a² P (1 - P)`` at the current ability estimate. Information
+peaks near ``b = theta``, so selection bisects into the sorted list and only
+scores a small window around it, which keeps it in the tens of
+microseconds. The domain is chosen first, as the one furthest below its
+blueprint weight.
+
+Ability is estimated by EAP on a fixed grid with a standard normal prior.
+The session keeps the log-posterior over the grid, so each answer updates it
+in O(grid) without replaying earlier responses. The test stops when the
+standard error drops below ``STOP_SE`` or at the maximum length.
+
+Item parameters come from the calibration statistics when a question has
+enough responses (``b`` from the p-value, ``a`` from the point-biserial
+discrimination); other questions get ``a = 1`` and ``b`` from their
+difficulty label.
+"""
+
+import bisect
+import math
+from collections import namedtuple
+
+from src.models.user import db
+from src.models.question import Question, QuestionCalibration
+from src.services.cache import route_cache
+from src.services.calibration import MIN_RESPONSES
+from src.services.exam_composer import EXAM_BLUEPRINTS, blueprint_domain, effective_weights
+
+GRID = [-4.0 + 0.2 * i for i in range(41)]
+PRIOR = [-0.5 * theta * theta for theta in GRID]
+
+DEFAULT_MAX_ITEMS = 30
+MIN_ITEMS = 10
+STOP_SE = 0.30
+SELECTION_WINDOW = 12
+
+LABEL_DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+MIN_DISCRIMINATION = 0.3
+MAX_DISCRIMINATION = 2.5
+
+BANK_TTL = 3600
+
+Item = namedtuple('Item', 'question_id domain a b')
+
+
+def probability(theta, a, b):
+    return 1.0 / (1.0 + math.exp(-a * (theta - b)))
+
+
+def information(theta, item):
+    p = probability(theta, item.a, item.b)
+    return item.a * item.a * p * (1.0 - p)
+
+
+def item_parameters(difficulty, calibration=None):
+    """``(a, b)`` from calibration statistics, or defaults from the difficulty label"""
+    if calibration is None or calibration[0] < MIN_RESPONSES or calibration[1] is None:
+        return 1.0, LABEL_DIFFICULTY.get(difficulty or 'medium', 0.0)
+    _, p_value, discrimination = calibration
+    p_value = min(max(p_value, 0.02), 0.98)
+    b = math.log((1.0 - p_value) / p_value) / 1.7
+    a = 1.0
+    if discrimination is not None and discrimination > 0:
+        r = min(discrimination, 0.95)
+        a = 1.7 * r / math.sqrt(1.0 - r * r)
+    return min(max(a, MIN_DISCRIMINATION), MAX_DISCRIMINATION), b
+
+
+class ItemBank:
+    """Items of one certification, sorted by ``b`` within each domain"""
+
+    def __init__(self, certification, items):
+        self.certification = certification
+        self.items = {item.question_id: item for item in items}
+        self.domains = {}
+        for item in sorted(items, key=lambda item: item.b):
+            self.domains.setdefault(item.domain, []).append(item)
+        self._keys = {domain: [item.b for item in bucket] for domain, bucket in self.domains.items()}
+        capacity = {domain: len(bucket) for domain, bucket in self.domains.items()}
+        self.weights = effective_weights(EXAM_BLUEPRINTS.get(certification, {}), capacity)
+
+    def __len__(self):
+        return len(self.items)
+
+    def next_domain(self, served):
+        """Domain furthest below its target share that still has unused items"""
+        counts = {}
+        for question_id in served:
+            item = self.items.get(question_id)
+            if item is not None:
+                counts[item.domain] = counts.get(item.domain, 0) + 1
+        total_weight = sum(self.weights.values())
+        total_served = len(served) + 1
+        candidates = [domain for domain, bucket in self.domains.items() if counts.get(domain, 0) < len(bucket)]
+        if not candidates:
+            return None
+        return max(
+            candidates,
+            key=lambda domain: self.weights[domain] / total_weight - counts.get(domain, 0) / total_served
+        )
+
+    def select(self, theta, exclude, domain):
+        """Most informative unused item of ``domain`` at ``theta``"""
+        bucket = self.domains[domain]
+        center = bisect.bisect_left(self._keys[domain], theta)
+        window = SELECTION_WINDOW
+        while True:
+            best = None
+            best_information = -1.0
+            for item in bucket[max(center - window, 0):center + window]:
+                if item.question_id in exclude:
+                    continue
+                value = information(theta, item)
+                if value > best_information:
+                    best, best_information = item, value
+            if best is not None or window >= len(bucket):
+                return best
+            window *= 2
+
+    def next_item(self, theta, served):
+        domain = self.next_domain(served)
+        return None if domain is None else self.select(theta, set(served), domain)
+
+
+def _build_bank(certification):
+    calibrations = {
+        question_id: (responses, p_value, discrimination)
+        for question_id, responses, p_value, discrimination in db.session.query(
+            QuestionCalibration.question_id, QuestionCalibration.responses,
+            QuestionCalibration.p_value, QuestionCalibration.discrimination
+        ).filter(QuestionCalibration.certification == certification)
+    }
+    blueprint = EXAM_BLUEPRINTS.get(certification, {})
+    items = []
+    for question_id, domain, difficulty in db.session.query(Question.id, Question.domain, Question.difficulty).filter(
+        Question.certification == certification
+    ):
+        a, b = item_parameters(difficulty, calibrations.get(question_id))
+        items.append(Item(question_id, blueprint_domain(blueprint, domain), a, b))
+    return ItemBank(certification, items)
+
+
+def item_bank(certification):
+    return route_cache.get_or_compute(
+        f'item_bank:{certification}',
+        lambda: _build_bank(certification),
+        ttl=BANK_TTL,
+        tags=(f'questions:{certification}', f'calibration:{certification}')
+    )
+
+
+def update_posterior(log_posterior, item, correct):
+    """Adds one response to the log-posterior over ``GRID``"""
+    updated = []
+    for theta, value in zip(GRID, log_posterior):
+        p = probability(theta, item.a, item.b)
+        updated.append(value + math.log(p if correct else 1.0 - p))
+    return updated
+
+
+def estimate(log_posterior):
+    """EAP ability and its standard error"""
+    peak = max(log_posterior)
+    weights = [math.exp(value - peak) for value in log_posterior]
+    total = sum(weights)
+    mean = sum(theta * weight for theta, weight in zip(GRID, weights)) / total
+    variance = sum((theta - mean) ** 2 * weight for theta, weight in zip(GRID, weights)) / total
+    return mean, math.sqrt(variance)
+
+
+def should_stop(answered, standard_error, max_items):
+    return answered >= max_items or (answered >= MIN_ITEMS and standard_error < STOP_SE)
+
+
+def scaled_score(theta):
+    """Readiness on the 100-1000 exam scale: the normal percentile of ``theta``"""
+    percentile = 0.5 * (1.0 + math.erf(theta / math.sqrt(2.0)))
+    return int(100 + percentile * 900)
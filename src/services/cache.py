@@ -0,0 +1,400 @@
+"""
+Caching framework for route handlers.
+
+``TTLCache`` is a size-bounded LRU whose entries expire after a TTL and can be
+invalidated in groups through tags (``questions:SAA-C03``). Concurrent misses
+on the same key are coalesced so a cold key is computed only once. The
+``cached`` decorator applies it to blueprint views.
+
+``TieredCache`` puts a ``TTLCache`` (L1, per process) in front of an optional
+shared backend (L2, Redis-compatible, see ``cache_backends``). Invalidations
+are published to the other workers so their L1 stays coherent, and bump a
+per-tag generation in the backend: a value computed while one of its tags
+was invalidated is not left in L2. L2 values are pickled and signed with
+HMAC-SHA256 (``CACHE_SIGNING_KEY``); entries with a bad signature are
+ignored instead of unpickled.
+
+An L2 value carries its expiry (wall clock), so an L2 hit is kept in L1
+only for the time the entry has left. The per-tag key sets in L2 expire
+too, no earlier than the longest-lived entry added to them.
+"""
+
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300
+
+# Prefixo das chaves e canal de invalidação no backend compartilhado
+KEY_PREFIX = 'simulados:cache:'
+INVALIDATION_CHANNEL = 'simulados:cache:invalidate'
+
+# Chave de assinatura padrão: vale só dentro deste processo
+PROCESS_SIGNING_KEY = os.urandom(32)
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+# Tempo máximo que um worker espera outro nó calcular a mesma chave
+COMPUTE_LOCK_TIMEOUT = 10
+COMPUTE_POLL_INTERVAL = 0.05
+
+
+class _Flight:
+    """A computation in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with TTL, tag invalidation and stampede protection"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tag_index = {}  # tag -> set(keys)
+        self._tag_versions = {}  # tag -> contador de invalidações
+        self._flights = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= self.clock():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None, tags=()):
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag):
+        """Drops every entry carrying ``tag``"""
+        with self._lock:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            for key in list(self._tag_index.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+            for tag in self._tag_versions:
+                self._tag_versions[tag] += 1
+
+    def get_or_compute(self, key, compute, ttl=None, tags=()):
+        """Returns the cached value for ``key``, computing it once on a miss
+
+        ``ttl`` may be a callable, called after ``compute`` to get the TTL.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                versions = {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                # Não grava um valor calculado antes de uma invalidação concorrente
+                if all(self._tag_versions.get(tag, 0) == version for tag, version in versions.items()):
+                    self.set(key, flight.value, ttl=ttl() if callable(ttl) else ttl, tags=tags)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+
+class TieredCache:
+    """Process-local L1 in front of a shared L2 backend with pub/sub invalidation
+
+    Without a backend it behaves exactly like its L1 ``TTLCache``.
+    """
+
+    def __init__(self, backend=None, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, signing_key=None):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.backend = None
+        self.node_id = uuid.uuid4().hex
+        self.signing_key = signing_key or PROCESS_SIGNING_KEY
+        if backend is not None:
+            self.attach(backend)
+
+    @property
+    def ttl(self):
+        return self.local.ttl
+
+    def __len__(self):
+        return len(self.local)
+
+    def attach(self, backend):
+        """Starts using ``backend`` as L2 and listening for invalidations"""
+        self.backend = backend
+        backend.subscribe(INVALIDATION_CHANNEL, self._on_message)
+
+    def _on_message(self, message):
+        event = json.loads(message)
+        if event.get('origin') == self.node_id:
+            return
+        if event['op'] == 'tag':
+            self.local.invalidate_tag(event['value'])
+        elif event['op'] == 'key':
+            self.local.delete(event['value'])
+        elif event['op'] == 'clear':
+            self.local.clear()
+
+    def _publish(self, op, value=None):
+        message = json.dumps({'op': op, 'value': value, 'origin': self.node_id})
+        self.backend.publish(INVALIDATION_CHANNEL, message)
+
+    def _sign(self, data):
+        return hmac.new(self.signing_key, data, hashlib.sha256).digest()
+
+    def _l2_get(self, key):
+        """``(value, tags, remaining ttl)`` of a live L2 entry, or ``None``"""
+        data = self.backend.get(KEY_PREFIX + key)
+        if data is None:
+            return None
+        signature, payload = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            logger.warning('Assinatura inválida na chave %s do cache compartilhado; ignorada', key)
+            return None
+        value, tags, expires_at = pickle.loads(payload)
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return None
+        return value, tags, remaining
+
+    def _l2_set(self, key, value, ttl, tags):
+        ttl = self.ttl if ttl is None else ttl
+        seconds = max(1, int(ttl))
+        payload = pickle.dumps((value, tuple(tags), time.time() + ttl))
+        self.backend.set(KEY_PREFIX + key, self._sign(payload) + payload, ex=seconds)
+        for tag in tags:
+            tag_key = KEY_PREFIX + 'tag:' + tag
+            self.backend.sadd(tag_key, key)
+            # O conjunto vive pelo menos tanto quanto a chave mais longa que contém
+            self.backend.expire_at_least(tag_key, seconds)
+
+    def _generations(self, tags):
+        """Current invalidation generation of each tag in the backend"""
+        return [self.backend.get(KEY_PREFIX + 'gen:' + tag) for tag in tags]
+
+    def get(self, key, default=None):
+        missing = object()
+        value = self.local.get(key, missing)
+        if value is not missing:
+            return value
+        if self.backend is not None:
+            entry = self._l2_get(key)
+            if entry is not None:
+                value, tags, remaining = entry
+                self.local.set(key, value, ttl=remaining, tags=tags)
+                return value
+        return default
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.local.set(key, value, ttl=ttl, tags=tags)
+        if self.backend is not None:
+            self._l2_set(key, value, ttl, tags)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.backend is not None:
+            self.backend.delete(KEY_PREFIX + key)
+            self._publish('key', key)
+
+    def invalidate_tag(self, tag):
+        self.local.invalidate_tag(tag)
+        if self.backend is not None:
+            # A geração sobe antes de ler os membros da tag (ver get_or_compute)
+            self.backend.incr(KEY_PREFIX + 'gen:' + tag)
+            tag_key = KEY_PREFIX + 'tag:' + tag
+            keys = [KEY_PREFIX + key.decode() if isinstance(key, bytes) else KEY_PREFIX + key
+                    for key in self.backend.smembers(tag_key)]
+            self.backend.delete(tag_key, *keys)
+            self._publish('tag', tag)
+
+    def clear(self):
+        """Clears this worker's L1 and asks the other workers to do the same"""
+        self.local.clear()
+        if self.backend is not None:
+            self._publish('clear')
+
+    def get_or_compute(self, key, compute, ttl=None, tags=()):
+        if self.backend is None:
+            return self.local.get_or_compute(key, compute, ttl=ttl, tags=tags)
+
+        # Um valor lido do L2 fica no L1 só pelo tempo que resta à entrada
+        local_ttl = [ttl]
+
+        def from_l2(entry):
+            local_ttl[0] = entry[2]
+            return entry[0]
+
+        def compute_shared():
+            entry = self._l2_get(key)
+            if entry is not None:
+                return from_l2(entry)
+
+            # Apenas um nó calcula a chave fria; os demais aguardam o L2
+            lock_key = KEY_PREFIX + 'lock:' + key
+            if not self.backend.set(lock_key, self.node_id, ex=COMPUTE_LOCK_TIMEOUT, nx=True):
+                deadline = time.monotonic() + COMPUTE_LOCK_TIMEOUT
+                while time.monotonic() < deadline:
+                    time.sleep(COMPUTE_POLL_INTERVAL)
+                    entry = self._l2_get(key)
+                    if entry is not None:
+                        return from_l2(entry)
+                    if self.backend.get(lock_key) is None:
+                        break
+            try:
+                generations = self._generations(tags)
+                value = compute()
+                # Uma invalidação durante o cálculo torna o valor obsoleto: não vai para o L2
+                if self._generations(tags) != generations:
+                    return value
+                self._l2_set(key, value, ttl, tags)
+                # Invalidação entre a verificação e a escrita: ou ela já viu a chave na tag
+                # e a apagou, ou a geração mudou e a chave é apagada aqui
+                if self._generations(tags) != generations:
+                    self.backend.delete(KEY_PREFIX + key)
+                return value
+            finally:
+                self.backend.delete(lock_key)
+
+        return self.local.get_or_compute(key, compute_shared, ttl=lambda: local_ttl[0], tags=tags)
+
+
+route_cache = TieredCache()
+
+
+def init_app(app):
+    """Configures ``route_cache`` from the app config
+
+    ``ROUTE_CACHE_MAXSIZE``/``ROUTE_CACHE_TTL`` size the L1, and
+    ``CACHE_BACKEND`` (``redis://...`` URL or ``memory``) enables the L2.
+    A backend shared between processes needs ``CACHE_SIGNING_KEY``, the same
+    secret in every worker.
+    """
+    route_cache.local.maxsize = app.config.get('ROUTE_CACHE_MAXSIZE', route_cache.local.maxsize)
+    route_cache.local.ttl = app.config.get('ROUTE_CACHE_TTL', route_cache.local.ttl)
+
+    backend_url = app.config.get('CACHE_BACKEND')
+    signing_key = app.config.get('CACHE_SIGNING_KEY')
+    if backend_url and backend_url != 'memory' and not signing_key:
+        raise RuntimeError('CACHE_SIGNING_KEY é obrigatório com um CACHE_BACKEND compartilhado')
+    if signing_key:
+        route_cache.signing_key = signing_key.encode() if isinstance(signing_key, str) else signing_key
+    if backend_url and route_cache.backend is None:
+        from src.services.cache_backends import backend_from_url
+        route_cache.attach(backend_from_url(backend_url))
+
+
+class _Uncacheable(Exception):
+    """Carries a non-200 response out of ``get_or_compute`` without caching it"""
+
+    def __init__(self, frozen):
+        super().__init__()
+        self.frozen = frozen
+
+
+def _freeze(rv):
+    response = make_response(rv)
+    return response.status_code, response.get_data(), list(response.headers.items())
+
+
+def _thaw(frozen):
+    status, data, headers = frozen
+    return Response(data, status=status, headers=headers)
+
+
+def cached(ttl=None, tags=(), cache=None):
+    """Caches a view's response per URL path and query string.
+
+    ``tags`` are format strings filled with the view arguments, e.g.
+    ``'questions:{certification}'``. Only 200 responses are stored; each hit
+    gets a fresh ``Response`` object.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            target = cache if cache is not None else route_cache
+            key = f'{view.__module__}.{view.__qualname__}:{request.full_path}'
+            view_tags = [tag.format(**kwargs) for tag in tags]
+
+            def compute():
+                frozen = _freeze(view(*args, **kwargs))
+                if frozen[0] != 200:
+                    # Erros não vão para o cache; sinaliza para devolver direto
+                    raise _Uncacheable(frozen)
+                return frozen
+
+            try:
+                frozen = target.get_or_compute(key, compute, ttl=ttl, tags=view_tags)
+            except _Uncacheable as e:
+                frozen = e.frozen
+            return _thaw(frozen)
+        return wrapper
+    return decorator
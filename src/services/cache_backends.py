@@ -0,0 +1,196 @@
+"""
+Shared (L2) backends for ``TieredCache``.
+
+A backend exposes the small Redis-compatible subset the cache needs: ``get``,
+``set`` (with ``ex``/``nx``), ``delete``, ``incr``, ``sadd``, ``smembers``,
+``expire_at_least``, ``publish`` and ``subscribe``. ``RedisBackend`` wraps a ``redis`` client; ``InMemoryBackend``
+is an in-process stand-in that several ``TieredCache`` instances can share to
+simulate multiple workers without a server.
+"""
+
+import threading
+import time
+
+
+class CacheBackend:
+    """Interface expected from a shared cache backend"""
+
+    def get(self, name):
+        raise NotImplementedError
+
+    def set(self, name, value, ex=None, nx=False):
+        """Stores ``value``; with ``nx`` only if absent. Returns ``True`` if stored"""
+        raise NotImplementedError
+
+    def delete(self, *names):
+        raise NotImplementedError
+
+    def incr(self, name):
+        """Atomically increments an integer counter; returns the new value"""
+        raise NotImplementedError
+
+    def sadd(self, name, *values):
+        raise NotImplementedError
+
+    def smembers(self, name):
+        raise NotImplementedError
+
+    def expire_at_least(self, name, seconds):
+        """Makes ``name`` expire in ``seconds`` unless it already lives longer"""
+        raise NotImplementedError
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        """Calls ``callback(message)`` for every message published on ``channel``"""
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """In-process fake backend with Redis semantics for the supported commands"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._data = {}  # name -> (expires_at | None, value)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        entry = self._data.get(name)
+        if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+            del self._data[name]
+            return None
+        return entry
+
+    def get(self, name):
+        with self._lock:
+            entry = self._live(name)
+            return None if entry is None else entry[1]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return False
+            expires_at = self.clock() + ex if ex is not None else None
+            self._data[name] = (expires_at, value if isinstance(value, bytes) else str(value).encode())
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def incr(self, name):
+        with self._lock:
+            entry = self._live(name)
+            value = (int(entry[1]) if entry is not None else 0) + 1
+            self._data[name] = (entry[0] if entry is not None else None, str(value).encode())
+            return value
+
+    def sadd(self, name, *values):
+        with self._lock:
+            entry = self._live(name)
+            members = entry[1] if entry is not None else set()
+            added = len(set(values) - members)
+            members.update(values)
+            # Como no Redis, SADD mantém a expiração do conjunto
+            self._data[name] = (entry[0] if entry is not None else None, members)
+            return added
+
+    def smembers(self, name):
+        with self._lock:
+            entry = self._live(name)
+            return set(entry[1]) if entry is not None else set()
+
+    def expire_at_least(self, name, seconds):
+        with self._lock:
+            entry = self._live(name)
+            if entry is None:
+                return False
+            expires_at = self.clock() + seconds
+            if entry[0] is None or entry[0] < expires_at:
+                self._data[name] = (expires_at, entry[1])
+            return True
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+        return len(callbacks)
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+
+# Só estende a expiração (TTL -1: sem expiração; -2: chave inexistente, EXPIRE não faz nada)
+EXPIRE_AT_LEAST_SCRIPT = """
+if redis.call('ttl', KEYS[1]) < tonumber(ARGV[1]) then
+    return redis.call('expire', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+class RedisBackend(CacheBackend):
+    """Backend over a ``redis.Redis`` client (requires the ``redis`` package)"""
+
+    def __init__(self, client):
+        self.client = client
+        self._expire_at_least = client.register_script(EXPIRE_AT_LEAST_SCRIPT)
+        self._pubsub = None
+        self._thread = None
+
+    @classmethod
+    def from_url(cls, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('O pacote "redis" é necessário para CACHE_BACKEND=redis://') from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, name):
+        return self.client.get(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        return bool(self.client.set(name, value, ex=ex, nx=nx))
+
+    def delete(self, *names):
+        return self.client.delete(*names) if names else 0
+
+    def incr(self, name):
+        return self.client.incr(name)
+
+    def sadd(self, name, *values):
+        return self.client.sadd(name, *values)
+
+    def smembers(self, name):
+        return self.client.smembers(name)
+
+    def expire_at_least(self, name, seconds):
+        return bool(self._expire_at_least(keys=[name], args=[int(seconds)]))
+
+    def publish(self, channel, message):
+        return self.client.publish(channel, message)
+
+    def subscribe(self, channel, callback):
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+
+        def handler(message):
+            data = message['data']
+            callback(data.decode() if isinstance(data, bytes) else data)
+
+        self._pubsub.subscribe(**{channel: handler})
+        if self._thread is None:
+            self._thread = self._pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+
+def backend_from_url(url):
+    """Builds a backend from ``CACHE_BACKEND`` (``redis://...`` or ``memory``)"""
+    if url == 'memory':
+        return InMemoryBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend.from_url(url)
+    raise ValueError(f'CACHE_BACKEND não suportado: {url}')
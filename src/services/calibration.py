@@ -0,0 +1,214 @@
+"""
+Question difficulty calibration from answer history.
+
+Classical item statistics are computed per question from the graded
+answers in ``session_answers``:
+
+- p-value: share of correct answers;
+- discrimination: point-biserial correlation between answering the item
+  correctly and the rest score (the session's score without that item).
+
+Both are derived from sufficient statistics (counts and sums) kept in
+``question_calibrations``. Each run streams only the answers above the
+watermark of the previous run (``calibration_runs``), adds them to the sums
+and recomputes the derived values, so history is never rescanned.
+
+A resubmission replaces a session's answers with new rows above the
+watermark (``session_answers`` is ``AUTOINCREMENT``, so deleted ids are
+never handed out again). ``calibrated_sessions`` keeps, per session, the submission
+(``completed_at``) and the terms it added; when a newer submission of the
+session is streamed, the earlier terms are subtracted first.
+
+Runs only write when they commit, and each records the watermark it
+started from under a unique constraint: of two concurrent runs from the
+same watermark, the second to commit fails with ``CalibrationInProgress``
+and adds nothing.
+"""
+
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db
+from src.models.question import (
+    SessionAnswer, SimulationSession, QuestionCalibration, CalibratedSession, CalibrationRun
+)
+from src.services.cache import route_cache
+
+CHUNK_SIZE = 5000
+
+# Respostas mínimas para que a dificuldade calibrada substitua a manual
+MIN_RESPONSES = 30
+
+# Faixas de p-value: acima de EASY_P é fácil, abaixo de HARD_P é difícil
+EASY_P = 0.75
+HARD_P = 0.40
+
+
+class CalibrationInProgress(Exception):
+    """Raised when another run committed the same answers first"""
+
+
+def difficulty_for(p_value):
+    if p_value >= EASY_P:
+        return 'easy'
+    if p_value < HARD_P:
+        return 'hard'
+    return 'medium'
+
+
+def point_biserial(n, sum_x, sum_y, sum_y2, sum_xy):
+    """Correlation between a 0/1 variable and a continuous one, from their sums"""
+    covariance = n * sum_xy - sum_x * sum_y
+    variance_x = n * sum_x - sum_x * sum_x  # x² = x para variáveis 0/1
+    variance_y = n * sum_y2 - sum_y * sum_y
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+    return covariance / math.sqrt(variance_x * variance_y)
+
+
+def watermark():
+    return db.session.query(db.func.max(CalibrationRun.last_answer_id)).scalar() or 0
+
+
+def _stream(after_id, chunk_size):
+    """Yields chunks of ``(answer_id, session_id, completed_at, question_id, certification, is_correct, rest_score)``"""
+    last_id = after_id
+    while True:
+        rows = db.session.query(
+            SessionAnswer.id, SessionAnswer.session_id, SessionAnswer.question_id, SessionAnswer.is_correct,
+            SimulationSession.certification, SimulationSession.completed_at,
+            SimulationSession.correct_answers, SimulationSession.total_questions
+        ).join(SimulationSession, SimulationSession.id == SessionAnswer.session_id).filter(
+            SessionAnswer.id > last_id
+        ).order_by(SessionAnswer.id).limit(chunk_size).all()
+        if not rows:
+            return
+        chunk = []
+        for (answer_id, session_id, question_id, is_correct, certification, completed_at,
+             correct_answers, total_questions) in rows:
+            x = 1 if is_correct else 0
+            # Escore do restante da prova, sem o próprio item
+            rest = (correct_answers - x) / (total_questions - 1) if total_questions > 1 else 0.0
+            chunk.append((answer_id, session_id, completed_at, question_id, certification, x, rest))
+        last_id = rows[-1][0]
+        yield chunk
+
+
+def _add(sums, question_id, certification, x, rest, sign=1):
+    entry = sums.get(question_id)
+    if entry is None:
+        entry = sums[question_id] = [certification, 0, 0, 0.0, 0.0, 0.0]
+    entry[1] += sign
+    entry[2] += sign * x
+    entry[3] += sign * rest
+    entry[4] += sign * rest * rest
+    entry[5] += sign * x * rest
+
+
+def run(chunk_size=CHUNK_SIZE):
+    """Adds the answers graded since the last run; returns the run record"""
+    previous = watermark()
+    calibration_run = CalibrationRun(
+        previous_answer_id=previous, last_answer_id=previous, answers_processed=0, questions_updated=0,
+        started_at=datetime.utcnow()
+    )
+    touched = {}
+    graded = {}  # session_id -> (CalibratedSession, termos somados)
+    processed = 0
+
+    # Nada é gravado antes do commit: a leitura não segura o lock de escrita do banco
+    with db.session.no_autoflush:
+        for chunk in _stream(previous, chunk_size):
+            missing = list({row[1] for row in chunk if row[1] not in graded})
+            if missing:
+                for record in CalibratedSession.query.filter(CalibratedSession.session_id.in_(missing)):
+                    graded[record.session_id] = (record, json.loads(record.answers))
+
+            # Soma o lote por questão antes de tocar nas linhas do ORM
+            sums = {}
+            for _, session_id, completed_at, question_id, certification, x, rest in chunk:
+                entry = graded.get(session_id)
+                if entry is None:
+                    record = CalibratedSession(session_id=session_id, completed_at=completed_at)
+                    db.session.add(record)
+                    entry = graded[session_id] = (record, [])
+                elif entry[0].completed_at != completed_at:
+                    # Ressubmissão: retira o que a submissão anterior somou
+                    for terms in entry[1]:
+                        _add(sums, terms[0], certification, terms[1], terms[2], -1)
+                    entry[0].completed_at = completed_at
+                    entry = graded[session_id] = (entry[0], [])
+                entry[1].append((question_id, x, rest))
+                _add(sums, question_id, certification, x, rest)
+
+            missing = [question_id for question_id in sums if question_id not in touched]
+            if missing:
+                for calibration in QuestionCalibration.query.filter(QuestionCalibration.question_id.in_(missing)):
+                    touched[calibration.question_id] = calibration
+
+            for question_id, (certification, n, correct, sum_rest, sum_rest_sq, sum_correct_rest) in sums.items():
+                calibration = touched.get(question_id)
+                if calibration is None:
+                    calibration = touched[question_id] = QuestionCalibration(
+                        question_id=question_id, certification=certification, responses=0, correct=0,
+                        sum_rest=0.0, sum_rest_sq=0.0, sum_correct_rest=0.0
+                    )
+                    db.session.add(calibration)
+                calibration.responses += n
+                calibration.correct += correct
+                calibration.sum_rest += sum_rest
+                calibration.sum_rest_sq += sum_rest_sq
+                calibration.sum_correct_rest += sum_correct_rest
+
+            processed += len(chunk)
+            calibration_run.last_answer_id = chunk[-1][0]
+
+    if not processed:
+        # Execução vazia não é registrada: a próxima parte da mesma marca d'água
+        return calibration_run
+
+    for record, terms in graded.values():
+        record.answers = json.dumps(terms, separators=(',', ':'))
+
+    for calibration in touched.values():
+        calibration.p_value = calibration.correct / calibration.responses if calibration.responses else None
+        calibration.discrimination = point_biserial(
+            calibration.responses, calibration.correct, calibration.sum_rest,
+            calibration.sum_rest_sq, calibration.sum_correct_rest
+        )
+        calibration.calibrated_difficulty = (
+            difficulty_for(calibration.p_value) if calibration.responses >= MIN_RESPONSES else None
+        )
+
+    calibration_run.answers_processed = processed
+    calibration_run.questions_updated = len(touched)
+    calibration_run.finished_at = datetime.utcnow()
+    db.session.add(calibration_run)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outra execução partiu da mesma marca d'água e gravou primeiro
+        db.session.rollback()
+        raise CalibrationInProgress()
+
+    for certification in {calibration.certification for calibration in touched.values()}:
+        route_cache.invalidate_tag(f'calibration:{certification}')
+    return calibration_run
+
+
+def calibrated_difficulties(certification):
+    """``{question_id: difficulty}`` for questions with enough responses"""
+    return route_cache.get_or_compute(
+        f'calibrated_difficulties:{certification}',
+        lambda: dict(
+            db.session.query(QuestionCalibration.question_id, QuestionCalibration.calibrated_difficulty).filter(
+                QuestionCalibration.certification == certification,
+                QuestionCalibration.calibrated_difficulty.isnot(None)
+            )
+        ),
+        ttl=3600,
+        tags=(f'calibration:{certification}',)
+    )
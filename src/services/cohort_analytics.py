@@ -0,0 +1,278 @@
+"""
+Cohort analytics over completed simulations.
+
+Each certification has a columnar extract of its completed sessions: typed
+``array`` columns of score, time taken and completion time (epoch seconds).
+Score distribution, percentile ranks, pass rate over time and the
+time-taken histogram come from counts folded from those columns, never
+from ORM objects.
+
+The extract is refreshed incrementally. New rows are read by id above a
+watermark, projecting only the needed columns. Sessions still open at the
+previous refresh are kept in an ``open`` set and rechecked, since they can
+complete after later ids were read. Open sessions older than
+``ABANDON_AFTER`` are dropped. A full rebuild every ``REBUILD_INTERVAL``
+picks up resubmissions and anything dropped.
+"""
+
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from src.models.user import db
+from src.models.question import SimulationSession
+
+PASSING_SCORES = {
+    'CLF-C02': 700,
+    'AIF-C01': 700,
+    'SAA-C03': 720,
+    'SAP-C02': 750
+}
+DEFAULT_PASSING_SCORE = 700
+
+MIN_SCORE = 100
+MAX_SCORE = 1000
+DEFAULT_SCORE_BINS = 18
+DEFAULT_TIME_BIN_MINUTES = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+PERIODS = ('day', 'week', 'month')
+
+CHUNK_SIZE = 5000
+REFRESH_INTERVAL = 5
+REBUILD_INTERVAL = 3600
+ABANDON_AFTER = timedelta(days=1)
+
+DAY = 86400
+
+
+def passing_score(certification):
+    return PASSING_SCORES.get(certification, DEFAULT_PASSING_SCORE)
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class CohortColumns:
+    """Columns of the completed sessions of one certification.
+
+    Rows appended since the last report are folded into counts per score
+    point, per minute taken and per completion day, so a report costs
+    O(new rows + bins) instead of a pass over the whole history.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.score = array('d')
+        self.time_taken = array('l')  # -1 quando não informado
+        self.completed_at = array('d')
+        self.score_counts = array('l', bytes(array('l').itemsize * (MAX_SCORE + 1)))
+        self.score_sum = 0.0
+        self.minute_counts = {}
+        self.day_counts = {}  # dia (epoch) -> [sessões, aprovadas]
+        self._folded = 0
+
+    def __len__(self):
+        return len(self.score)
+
+    def append(self, score, time_taken, completed_at):
+        self.score.append(score or 0.0)
+        self.time_taken.append(-1 if time_taken is None else time_taken)
+        self.completed_at.append(_epoch(completed_at))
+
+    def fold(self):
+        start = self._folded
+        if start == len(self.score):
+            return self
+        threshold = self.threshold
+        for score, seconds, completed_at in zip(self.score[start:], self.time_taken[start:], self.completed_at[start:]):
+            self.score_counts[min(max(int(score), 0), MAX_SCORE)] += 1
+            self.score_sum += score
+            if seconds >= 0:
+                minute = seconds // 60
+                self.minute_counts[minute] = self.minute_counts.get(minute, 0) + 1
+            day = int(completed_at // DAY)
+            entry = self.day_counts.get(day)
+            if entry is None:
+                entry = self.day_counts[day] = [0, 0]
+            entry[0] += 1
+            entry[1] += score >= threshold
+        self._folded = len(self.score)
+        return self
+
+
+def score_distribution(columns, bins=DEFAULT_SCORE_BINS):
+    width = (MAX_SCORE - MIN_SCORE) / bins
+    counts = [0] * bins
+    last = bins - 1
+    for point, count in enumerate(columns.score_counts):
+        if count:
+            counts[min(max(int((point - MIN_SCORE) // width), 0), last)] += count
+    return [
+        {'min': round(MIN_SCORE + i * width, 1), 'max': round(MIN_SCORE + (i + 1) * width, 1), 'count': count}
+        for i, count in enumerate(counts)
+    ]
+
+
+def percentiles(columns, points=PERCENTILES):
+    """Nearest-rank percentiles of the score column"""
+    n = len(columns)
+    if not n:
+        return {}
+    ranks = {p: max(-(-p * n // 100), 1) for p in points}
+    result = {}
+    cumulative = 0
+    for point, count in enumerate(columns.score_counts):
+        cumulative += count
+        for p, rank in ranks.items():
+            if rank <= cumulative and f'p{p}' not in result:
+                result[f'p{p}'] = point
+    return result
+
+
+def percentile_rank(columns, score):
+    """Share of sessions scoring below ``score`` (ties count half), in percent"""
+    n = len(columns)
+    if not n:
+        return None
+    point = min(max(int(score), 0), MAX_SCORE)
+    below = sum(columns.score_counts[:point])
+    return round((below + columns.score_counts[point] / 2) / n * 100, 1)
+
+
+def _period_labels(days, period):
+    """Label of each distinct epoch day for the given period"""
+    labels = {}
+    for day in days:
+        date = datetime.fromtimestamp(day * DAY, timezone.utc).date()
+        if period == 'week':
+            date -= timedelta(days=date.weekday())
+        labels[day] = date.strftime('%Y-%m') if period == 'month' else date.isoformat()
+    return labels
+
+
+def pass_rate_over_time(columns, period='week'):
+    labels = _period_labels(columns.day_counts, period)
+    periods = {}
+    for day, (sessions, passed) in columns.day_counts.items():
+        entry = periods.setdefault(labels[day], [0, 0])
+        entry[0] += sessions
+        entry[1] += passed
+    return [
+        {'period': label, 'sessions': sessions, 'passed': passed, 'pass_rate': round(passed / sessions * 100, 1)}
+        for label, (sessions, passed) in sorted(periods.items())
+    ]
+
+
+def time_histogram(columns, bin_minutes=DEFAULT_TIME_BIN_MINUTES):
+    counts = {}
+    for minute, count in columns.minute_counts.items():
+        index = minute // bin_minutes
+        counts[index] = counts.get(index, 0) + count
+    return [
+        {'min_minutes': index * bin_minutes, 'max_minutes': (index + 1) * bin_minutes, 'count': count}
+        for index, count in sorted(counts.items())
+    ]
+
+
+class CohortAnalytics:
+    """Incrementally refreshed columnar extract of completed sessions"""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, rebuild_interval=REBUILD_INTERVAL,
+                 chunk_size=CHUNK_SIZE):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._columns = {}
+        self._open = {}  # id -> started_at das sessões ainda não concluídas
+        self._watermark = 0
+        self._built_at = time.monotonic()
+        self._refreshed_at = None
+
+    def invalidate(self):
+        """Forces a full rebuild on the next refresh"""
+        with self._lock:
+            self._reset()
+
+    def _append(self, certification, score, time_taken, completed_at):
+        columns = self._columns.get(certification)
+        if columns is None:
+            columns = self._columns[certification] = CohortColumns(passing_score(certification))
+        columns.append(score, time_taken, completed_at)
+
+    def _load_new(self):
+        while True:
+            rows = db.session.query(
+                SimulationSession.id, SimulationSession.certification, SimulationSession.score,
+                SimulationSession.time_taken, SimulationSession.started_at, SimulationSession.completed_at
+            ).filter(SimulationSession.id > self._watermark).order_by(SimulationSession.id).limit(
+                self.chunk_size
+            ).all()
+            if not rows:
+                return
+            for session_id, certification, score, time_taken, started_at, completed_at in rows:
+                if completed_at is None:
+                    self._open[session_id] = started_at
+                else:
+                    self._append(certification, score, time_taken, completed_at)
+            self._watermark = rows[-1][0]
+
+    def _load_completed_open(self):
+        open_ids = list(self._open)
+        for start in range(0, len(open_ids), self.chunk_size):
+            rows = db.session.query(
+                SimulationSession.id, SimulationSession.certification, SimulationSession.score,
+                SimulationSession.time_taken, SimulationSession.completed_at
+            ).filter(
+                SimulationSession.id.in_(open_ids[start:start + self.chunk_size]),
+                SimulationSession.completed_at.isnot(None)
+            )
+            for session_id, certification, score, time_taken, completed_at in rows:
+                del self._open[session_id]
+                self._append(certification, score, time_taken, completed_at)
+
+        cutoff = datetime.utcnow() - ABANDON_AFTER
+        for session_id, started_at in list(self._open.items()):
+            if started_at is None or started_at < cutoff:
+                del self._open[session_id]
+
+    def refresh(self, force=False):
+        """Reads sessions completed since the last refresh (rate limited unless ``force``)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._built_at >= self.rebuild_interval:
+                self._reset()
+            elif not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            self._load_completed_open()
+            self._load_new()
+            self._refreshed_at = now
+
+    def report(self, certification, score_bins=DEFAULT_SCORE_BINS, period='week',
+               time_bin_minutes=DEFAULT_TIME_BIN_MINUTES, score=None):
+        """Distribution, percentiles, pass rate over time and time histogram of a certification"""
+        self.refresh()
+        with self._lock:
+            columns = (self._columns.get(certification) or CohortColumns(passing_score(certification))).fold()
+            completed = len(columns)
+            report = {
+                'certification': certification,
+                'completed_sessions': completed,
+                'passing_score': columns.threshold,
+                'average_score': round(columns.score_sum / completed, 1) if completed else 0,
+                'score_distribution': score_distribution(columns, score_bins),
+                'percentiles': percentiles(columns),
+                'pass_rate_over_time': pass_rate_over_time(columns, period),
+                'time_taken_histogram': time_histogram(columns, time_bin_minutes)
+            }
+            if score is not None:
+                report['percentile_rank'] = {'score': score, 'rank': percentile_rank(columns, score)}
+        return report
+
+
+cohort_analytics = CohortAnalytics()
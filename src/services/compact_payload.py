@@ -0,0 +1,97 @@
+"""
+Compact, columnar exam payloads.
+
+Clients that send ``Accept: application/vnd.simulados.compact+json`` (or
+``+msgpack`` when the ``msgpack`` package is installed) get the question list
+of an exam as columns instead of one object per question. Repeated strings
+(certification, domain, difficulty, question type and answer options) are
+stored once in ``strings`` and referenced by index:
+
+    {
+      "format": "compact/1",
+      "strings": ["CLF-C02", "Cloud Concepts", "easy", ...],
+      "questions": {
+        "count": 2,
+        "id": [12, 40],
+        "certification": [0, 0],
+        "domain": [1, 4],
+        "difficulty": [2, 2],
+        "question_type": [3, 3],
+        "question_text": ["...", "..."],
+        "options": [[5, 6, 7, 8], [9, 5, 10, 11]]
+      },
+      ...other top-level fields unchanged
+    }
+
+Everything else in the response is returned as-is. Clients that do not ask
+for a compact type keep getting the regular JSON.
+"""
+
+from flask import Response, current_app, jsonify, request
+
+try:
+    import msgpack
+except ImportError:  # pacote opcional
+    msgpack = None
+
+FORMAT_VERSION = 'compact/1'
+
+JSON_MIMETYPE = 'application/json'
+COMPACT_JSON_MIMETYPE = 'application/vnd.simulados.compact+json'
+COMPACT_MSGPACK_MIMETYPE = 'application/vnd.simulados.compact+msgpack'
+
+INTERNED_COLUMNS = ('certification', 'domain', 'difficulty', 'question_type')
+PLAIN_COLUMNS = ('id', 'question_text')
+
+
+class StringTable:
+    """Assigns each distinct string a stable index in order of first use"""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __call__(self, value):
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def columnar(questions, strings):
+    """Turns a list of question dicts into interned columns"""
+    columns = {'count': len(questions)}
+    for column in PLAIN_COLUMNS:
+        columns[column] = [question.get(column) for question in questions]
+    for column in INTERNED_COLUMNS:
+        columns[column] = [strings(question.get(column)) for question in questions]
+    columns['options'] = [[strings(option) for option in question.get('options', [])] for question in questions]
+    return columns
+
+
+def negotiate():
+    """Best response type for the current request's Accept header"""
+    offered = [JSON_MIMETYPE, COMPACT_JSON_MIMETYPE]
+    if msgpack is not None:
+        offered.append(COMPACT_MSGPACK_MIMETYPE)
+    return request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+
+
+def exam_response(payload, questions_key='questions'):
+    """Responds with ``payload`` in the format negotiated with the client"""
+    mimetype = negotiate()
+    if mimetype == JSON_MIMETYPE:
+        response = jsonify(payload)
+    else:
+        strings = StringTable()
+        compact = dict(payload, format=FORMAT_VERSION)
+        compact[questions_key] = columnar(payload[questions_key], strings)
+        compact['strings'] = strings.strings
+        if mimetype == COMPACT_MSGPACK_MIMETYPE:
+            body = msgpack.packb(compact, use_bin_type=True)
+        else:
+            body = current_app.json.dumps(compact, separators=(',', ':'))
+        response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,64 @@
+"""
+SQLite connection tuning for the database binds.
+
+The default bind (sessions, users, exposure history) takes constant small
+writes. It runs in WAL mode with ``synchronous=NORMAL``, so readers never
+wait for a writer and a commit does not fsync the main database file.
+
+The ``questions`` bind is read-mostly. Its connections get a large page
+cache and memory-mapped I/O. When the bind is a snapshot it is also
+``query_only``: the file is opened ``immutable``, so it can be shared by any
+number of processes without locks.
+"""
+
+from sqlalchemy import event
+
+from src.models.user import db
+
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KIB = 16 * 1024
+
+WRITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', BUSY_TIMEOUT_MS),
+    ('temp_store', 'MEMORY'),
+)
+
+READ_PRAGMAS = (
+    ('mmap_size', MMAP_SIZE),
+    ('cache_size', -CACHE_SIZE_KIB),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def _pragma_listener(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def bind_pragmas(bind_key, read_only):
+    if bind_key != 'questions':
+        return WRITE_PRAGMAS
+    if read_only:
+        return READ_PRAGMAS + (('query_only', 1),)
+    # Banco de questões gravável (seeder, importação): também aceita escritas concorrentes
+    return READ_PRAGMAS + (('busy_timeout', BUSY_TIMEOUT_MS),)
+
+
+def init_app(app):
+    """Registers the pragmas on every SQLite engine; call after ``db.init_app``"""
+    read_only = bool(app.config.get('QUESTION_BANK_SNAPSHOT'))
+    with app.app_context():
+        engines = dict(db.engines)
+    for bind_key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        event.listen(engine, 'connect', _pragma_listener(bind_pragmas(bind_key, read_only)))
@@ -0,0 +1,73 @@
+"""
+Per-domain score breakdown of completed simulations.
+
+``submit`` counts correct/total answers per domain and stores them in the
+``session_domain_scores`` side table, indexed by (certification, domain).
+The results endpoint reads a session's breakdown with one indexed query,
+and analytics aggregate across sessions with plain ``GROUP BY`` SQL instead
+of parsing session blobs.
+"""
+
+from sqlalchemy import func, insert
+
+from src.models.user import db
+from src.models.question import SessionDomainScore
+
+
+def _score(domain, correct, total):
+    return {
+        'domain': domain,
+        'correct': correct,
+        'total': total,
+        'percentage': round(correct / total * 100, 1) if total else 0
+    }
+
+
+def domain_rows(session_id, certification, answers):
+    """Side-table rows from ``(domain, is_correct)`` pairs of one session"""
+    counts = {}
+    for domain, is_correct in answers:
+        correct, total = counts.get(domain, (0, 0))
+        counts[domain] = (correct + bool(is_correct), total + 1)
+    return [
+        {'session_id': session_id, 'certification': certification, 'domain': domain, 'correct': correct, 'total': total}
+        for domain, (correct, total) in sorted(counts.items())
+    ]
+
+
+def store(session_ids, rows):
+    """Replaces the breakdown of ``session_ids`` (a resubmission overwrites it)"""
+    db.session.query(SessionDomainScore).filter(SessionDomainScore.session_id.in_(session_ids)).delete(
+        synchronize_session=False
+    )
+    if rows:
+        db.session.execute(insert(SessionDomainScore), rows)
+
+
+def for_session(session_id):
+    rows = db.session.query(SessionDomainScore.domain, SessionDomainScore.correct, SessionDomainScore.total).filter(
+        SessionDomainScore.session_id == session_id
+    ).order_by(SessionDomainScore.domain)
+    return [_score(domain, correct, total) for domain, correct, total in rows]
+
+
+def from_results(questions_with_answers):
+    """Breakdown computed from a results list (sessions without side-table rows)"""
+    rows = domain_rows(None, None, ((item.get('domain'), item.get('is_correct')) for item in questions_with_answers))
+    return [_score(row['domain'], row['correct'], row['total']) for row in rows]
+
+
+def aggregate(certification):
+    """Accuracy per domain across every completed session of a certification"""
+    rows = db.session.query(
+        SessionDomainScore.domain,
+        func.sum(SessionDomainScore.correct),
+        func.sum(SessionDomainScore.total),
+        func.count(SessionDomainScore.session_id)
+    ).filter(SessionDomainScore.certification == certification).group_by(
+        SessionDomainScore.domain
+    ).order_by(SessionDomainScore.domain)
+    return [
+        dict(_score(domain, correct, total), sessions=sessions)
+        for domain, correct, total, sessions in rows
+    ]
@@ -0,0 +1,304 @@
+"""
+Exam composition engine.
+
+Exams are drawn stratified by domain weight and difficulty mix, following the
+blueprint of each certification. Question IDs are kept in precomputed pools per
+(certification, domain, difficulty), so composing an exam only samples from
+those pools and never scans the questions table. The pools live in the route
+cache, so with a shared backend a cold worker reuses pools built elsewhere.
+"""
+
+import random
+
+from src.models.user import db
+from src.models.question import Question
+from src.services.cache import route_cache
+from src.services.calibration import calibrated_difficulties
+
+# Os pools também são invalidados pela tag questions:<certificação>
+POOLS_TTL = 3600
+
+# Sorteios com rejeição por questão pedida antes de recorrer à varredura do pool
+REJECTION_ATTEMPTS = 4
+
+# Mix de dificuldade padrão usado quando o blueprint não define um
+DEFAULT_DIFFICULTY_MIX = {'easy': 0.3, 'medium': 0.5, 'hard': 0.2}
+
+# Pesos por domínio de cada certificação (guias oficiais dos exames AWS),
+# usando os nomes de domínio presentes no banco de questões
+EXAM_BLUEPRINTS = {
+    'CLF-C02': {
+        'domains': {
+            'Cloud Concepts': 0.24,
+            'Security and Compliance': 0.30,
+            'Technology': 0.34,
+            'Billing and Pricing': 0.12
+        },
+        # Nomes oficiais dos domínios usados por parte das questões
+        'aliases': {
+            'Billing, Pricing, and Support': 'Billing and Pricing',
+            'Cloud Technology and Services': 'Technology'
+        }
+    },
+    'AIF-C01': {
+        'domains': {
+            'Fundamentals of AI and ML': 0.35,
+            'AI and ML Services on AWS': 0.40,
+            'Responsible AI': 0.25
+        }
+    },
+    'SAA-C03': {
+        'domains': {
+            'Design Secure Architectures': 0.30,
+            'Design Resilient Architectures': 0.26,
+            'Design High-Performing Architectures': 0.24,
+            'Design Cost-Optimized Architectures': 0.20
+        }
+    },
+    'SAP-C02': {
+        'domains': {
+            'Design Solutions for Organizational Complexity': 0.26,
+            'Design for New Solutions': 0.29,
+            'Continuous Improvement for Existing Solutions': 0.25,
+            'Migration Planning': 0.20
+        },
+        'aliases': {
+            'Cost Control': 'Continuous Improvement for Existing Solutions'
+        }
+    }
+}
+
+
+def blueprint_domain(blueprint, domain):
+    """Blueprint domain a bank domain counts towards (itself unless it is an alias)"""
+    return blueprint.get('aliases', {}).get(domain, domain)
+
+
+def effective_weights(blueprint, capacity, domain_weights=None):
+    """Weight of each domain in ``capacity`` (``{blueprint domain: questions}``)
+
+    With the blueprint's own weights, domains it does not list get a weight
+    proportional to their pool size; with explicit ``domain_weights`` they
+    are only used to fill a shortfall.
+    """
+    explicit = bool(domain_weights)
+    weights = domain_weights or blueprint.get('domains') or {}
+    total = sum(capacity.values()) or 1
+    return {
+        domain: weights[domain] if domain in weights else (0 if explicit else size / total)
+        for domain, size in capacity.items()
+    }
+
+
+class InsufficientQuestionsError(Exception):
+    """Raised when a certification does not have enough questions for an exam"""
+
+
+def apportion(total, weights, capacity):
+    """Splits ``total`` among keys proportionally to ``weights`` (largest remainder).
+
+    No key receives more than its ``capacity``; whatever a saturated key cannot
+    take is redistributed among the others. Keys without weight are only used
+    to fill a remaining shortfall.
+    """
+    allocation = {key: 0 for key in capacity}
+    remaining = min(total, sum(capacity.values()))
+
+    for use_weights in (True, False):
+        while remaining > 0:
+            active = [key for key in capacity
+                      if allocation[key] < capacity[key] and (not use_weights or weights.get(key, 0) > 0)]
+            if not active:
+                break
+            active_weights = {key: weights.get(key, 0) if use_weights else 1 for key in active}
+            weight_sum = sum(active_weights.values())
+            quotas = {key: remaining * active_weights[key] / weight_sum for key in active}
+
+            assigned = 0
+            for key in active:
+                share = min(int(quotas[key]), capacity[key] - allocation[key])
+                allocation[key] += share
+                assigned += share
+
+            # Distribui as sobras pelas maiores partes fracionárias
+            leftover = remaining - assigned
+            for key in sorted(active, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+                if leftover == 0:
+                    break
+                if allocation[key] < capacity[key]:
+                    allocation[key] += 1
+                    assigned += 1
+                    leftover -= 1
+
+            remaining -= assigned
+            if assigned == 0:
+                break
+
+    return allocation
+
+
+class ExamComposer:
+    """Composes exams from per-(certification, domain, difficulty) ID pools"""
+
+    def __init__(self, blueprints=None):
+        self.blueprints = blueprints if blueprints is not None else EXAM_BLUEPRINTS
+
+    def invalidate(self, certification=None):
+        """Drops the pools of one certification (or all of them)"""
+        route_cache.invalidate_tag('exam_pools' if certification is None else f'exam_pools:{certification}')
+
+    def pools(self, certification):
+        """Returns ``{(blueprint domain, difficulty): [question_id, ...]}`` for a certification"""
+        return route_cache.get_or_compute(
+            f'exam_pools:{certification}',
+            lambda: self._build_pools(certification),
+            ttl=POOLS_TTL,
+            tags=(
+                'exam_pools', f'exam_pools:{certification}', f'questions:{certification}',
+                f'calibration:{certification}'
+            )
+        )
+
+    def _build_pools(self, certification):
+        rows = db.session.query(Question.id, Question.domain, Question.difficulty).filter(
+            Question.certification == certification
+        ).order_by(Question.id)
+
+        # Dificuldade calibrada pelo histórico de respostas prevalece sobre a manual
+        calibrated = calibrated_difficulties(certification)
+
+        # Domínios listados em aliases entram no pool do domínio do blueprint correspondente
+        blueprint = self.blueprints.get(certification, {})
+
+        pools = {}
+        for question_id, domain, difficulty in rows:
+            difficulty = calibrated.get(question_id) or difficulty or 'medium'
+            pools.setdefault((blueprint_domain(blueprint, domain), difficulty), []).append(question_id)
+        return pools
+
+    def count(self, certification):
+        return sum(len(ids) for ids in self.pools(certification).values())
+
+    @staticmethod
+    def _probe(pool, count, rng):
+        """Random distinct IDs of ``pool``, at most ``REJECTION_ATTEMPTS`` per requested ID
+
+        Yields nothing when ``count`` is over half the pool: a scan costs the
+        same and rejection would mostly hit repeated indexes.
+        """
+        if count * 2 > len(pool):
+            return
+        tried = set()
+        for _ in range(REJECTION_ATTEMPTS * count):
+            index = rng.randrange(len(pool))
+            if index not in tried:
+                tried.add(index)
+                yield pool[index]
+
+    @classmethod
+    def _draw(cls, pool, count, seen, rng):
+        """Samples ``count`` IDs from ``pool``, preferring IDs not in ``seen``"""
+        if not seen:
+            return rng.sample(pool, count)
+        # Amostragem com rejeição: O(count) enquanto a maior parte do pool não foi vista
+        picked = []
+        for question_id in cls._probe(pool, count, rng):
+            if question_id not in seen:
+                picked.append(question_id)
+                if len(picked) == count:
+                    return picked
+        # Pool quase esgotado para o usuário: varre uma vez
+        unseen = [question_id for question_id in pool if question_id not in seen]
+        if len(unseen) >= count:
+            return rng.sample(unseen, count)
+        already_seen = [question_id for question_id in pool if question_id in seen]
+        return unseen + rng.sample(already_seen, count - len(unseen))
+
+    @classmethod
+    def _draw_distinct(cls, pool, count, seen, rng, clusters, used_clusters, exclude=()):
+        """Like ``_draw`` but skipping IDs whose duplicate cluster was already used"""
+        picked = []
+        picked_ids = set()
+
+        def take(question_id):
+            if question_id in exclude or question_id in picked_ids:
+                return
+            cluster = clusters.get(question_id)
+            if cluster is not None:
+                if cluster in used_clusters:
+                    return
+                used_clusters.add(cluster)
+            picked.append(question_id)
+            picked_ids.add(question_id)
+
+        for question_id in cls._probe(pool, count, rng):
+            if not (seen and question_id in seen):
+                take(question_id)
+                if len(picked) == count:
+                    return picked
+
+        # Rejeição insuficiente (pool visto ou clusters esgotados): varre o pool, não vistas primeiro
+        candidates = rng.sample(pool, len(pool))
+        if seen:
+            candidates.sort(key=lambda question_id: question_id in seen)
+        for question_id in candidates:
+            if len(picked) == count:
+                break
+            take(question_id)
+        return picked
+
+    def compose(self, certification, num_questions, domain_weights=None, difficulty_mix=None, seen=None,
+                clusters=None, rng=random):
+        """Draws ``num_questions`` question IDs honoring the certification blueprint
+
+        When ``seen`` (an exposure bitset) is given, questions the user has not
+        answered yet are preferred within each domain/difficulty cell. When
+        ``clusters`` (``{question_id: cluster_id}``) is given, no two questions
+        of the same near-duplicate cluster are drawn.
+        """
+        pools = self.pools(certification)
+        available = sum(len(ids) for ids in pools.values())
+        if num_questions <= 0 or available < num_questions:
+            raise InsufficientQuestionsError(certification)
+
+        blueprint = self.blueprints.get(certification, {})
+        difficulty_mix = difficulty_mix or blueprint.get('difficulty') or DEFAULT_DIFFICULTY_MIX
+
+        domain_capacity = {}
+        for (domain, _), ids in pools.items():
+            domain_capacity[domain] = domain_capacity.get(domain, 0) + len(ids)
+        domain_weights = effective_weights(blueprint, domain_capacity, domain_weights)
+
+        # Sem pesos definidos, os domínios são ponderados pelo tamanho do pool
+        if not any(domain_weights.get(domain, 0) > 0 for domain in domain_capacity):
+            domain_weights = domain_capacity
+
+        selected = []
+        used_clusters = set()
+        for domain, domain_count in apportion(num_questions, domain_weights, domain_capacity).items():
+            if domain_count == 0:
+                continue
+            cells = {difficulty: len(ids) for (cell_domain, difficulty), ids in pools.items() if cell_domain == domain}
+            for difficulty, cell_count in apportion(domain_count, difficulty_mix, cells).items():
+                if not cell_count:
+                    continue
+                pool = pools[(domain, difficulty)]
+                if clusters is None:
+                    selected.extend(self._draw(pool, cell_count, seen, rng))
+                else:
+                    selected.extend(self._draw_distinct(pool, cell_count, seen, rng, clusters, used_clusters))
+
+        if clusters is not None and len(selected) < num_questions:
+            # Células limitadas pela restrição de clusters: completa com qualquer outra célula
+            remaining = [question_id for ids in pools.values() for question_id in ids]
+            selected.extend(self._draw_distinct(
+                remaining, num_questions - len(selected), seen, rng, clusters, used_clusters, exclude=set(selected)
+            ))
+            if len(selected) < num_questions:
+                raise InsufficientQuestionsError(certification)
+
+        rng.shuffle(selected)
+        return selected
+
+
+exam_composer = ExamComposer()
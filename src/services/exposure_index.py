@@ -0,0 +1,99 @@
+"""
+Per-user question exposure index.
+
+Every question served to a user is recorded in a compact bitset per
+(user, certification), offset by the lowest question ID seen so far. Exam
+generation checks membership with one byte lookup instead of walking the
+``questions_data`` blobs of past sessions.
+"""
+
+from src.models.user import db
+from src.models.question import QuestionExposure
+
+# Usuários sem nome compartilham o mesmo rótulo e não têm histórico próprio
+ANONYMOUS_USER_NAMES = {'', 'Anônimo'}
+
+
+class ExposureBitset:
+    """Set of question IDs stored as a little-endian bitset relative to ``base``
+
+    Bits live in a ``bytearray``, so a membership test reads one byte
+    instead of shifting the whole set.
+    """
+
+    def __init__(self, base=0, data=b''):
+        self.base = base
+        self.data = bytearray(data)
+
+    @classmethod
+    def from_bytes(cls, base, data):
+        return cls(base, data or b'')
+
+    def to_bytes(self):
+        return bytes(self.data.rstrip(b'\x00'))
+
+    def __contains__(self, question_id):
+        offset = question_id - self.base
+        return 0 <= offset < len(self.data) * 8 and self.data[offset >> 3] >> (offset & 7) & 1 == 1
+
+    def __bool__(self):
+        return any(self.data)
+
+    def __len__(self):
+        return int.from_bytes(self.data, 'little').bit_count()
+
+    def add_many(self, question_ids):
+        question_ids = list(question_ids)
+        if not question_ids:
+            return
+        lowest = min(question_ids)
+        if not self:
+            self.base = lowest
+            self.data = bytearray()
+        elif lowest < self.base:
+            # Rebase raro: desloca o conjunto inteiro uma única vez
+            bits = int.from_bytes(self.data, 'little') << (self.base - lowest)
+            self.data = bytearray(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+            self.base = lowest
+        needed = (max(question_ids) - self.base) // 8 + 1
+        if needed > len(self.data):
+            self.data.extend(bytes(needed - len(self.data)))
+        for question_id in question_ids:
+            offset = question_id - self.base
+            self.data[offset >> 3] |= 1 << (offset & 7)
+
+
+class ExposureIndex:
+    """Reads and records the questions served to each user"""
+
+    @staticmethod
+    def tracks(user_name):
+        return bool(user_name) and user_name not in ANONYMOUS_USER_NAMES
+
+    def _row(self, user_name, certification):
+        return QuestionExposure.query.filter_by(user_name=user_name, certification=certification).first()
+
+    def seen(self, user_name, certification):
+        """Returns the bitset of questions already served, or ``None`` if untracked"""
+        if not self.tracks(user_name):
+            return None
+        row = self._row(user_name, certification)
+        if row is None:
+            return ExposureBitset()
+        return ExposureBitset.from_bytes(row.base_id, row.seen)
+
+    def record(self, user_name, certification, question_ids):
+        """Adds ``question_ids`` to the user's history (committed by the caller)"""
+        if not self.tracks(user_name):
+            return
+        row = self._row(user_name, certification)
+        if row is None:
+            row = QuestionExposure(user_name=user_name, certification=certification)
+            db.session.add(row)
+        bitset = ExposureBitset.from_bytes(row.base_id or 0, row.seen)
+        bitset.add_many(question_ids)
+        row.base_id = bitset.base
+        row.seen = bitset.to_bytes()
+
+
+exposure_index = ExposureIndex()
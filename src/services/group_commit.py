@@ -0,0 +1,146 @@
+"""
+Group commit for new simulation sessions.
+
+Each ``start_simulation`` used to pay for its own transaction (and fsync).
+``GroupCommitter.insert`` hands the row to a committer thread and blocks;
+the thread collects every insert that arrives within a short window, writes
+them as one multi-row INSERT ... RETURNING in a single transaction, runs the
+per-row follow-up work (exposure history) in that same transaction and wakes
+each caller with its own id. Under a burst the number of commits grows with
+the number of windows rather than the number of requests.
+
+A window of ``0`` disables batching: rows are inserted and committed inline.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import insert
+
+from src.models.user import db
+from src.models.question import SimulationSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 200
+WAIT_TIMEOUT = 30.0
+
+
+class _PendingInsert:
+    __slots__ = ('values', 'after', 'done', 'id', 'error')
+
+    def __init__(self, values, after):
+        self.values = values
+        self.after = after
+        self.done = threading.Event()
+        self.id = None
+        self.error = None
+
+
+class GroupCommitter:
+    """Coalesces concurrent single-row inserts of ``model`` into shared transactions"""
+
+    def __init__(self, model, app=None):
+        self.model = model
+        self.app = None
+        self.window = DEFAULT_WINDOW
+        self.max_batch = DEFAULT_MAX_BATCH
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config.get('SESSION_GROUP_COMMIT_WINDOW', DEFAULT_WINDOW)
+        self.max_batch = app.config.get('SESSION_GROUP_COMMIT_MAX_BATCH', DEFAULT_MAX_BATCH)
+
+    def insert(self, values, after=None):
+        """Inserts one row and returns its id once the shared transaction commits
+
+        ``after()`` runs inside that transaction, after the row is inserted.
+        The caller's session is closed first, so waiting requests do not hold
+        pooled connections the committer needs; objects it loaded stay usable.
+        """
+        if not self.window:
+            return self._insert_inline(values, after)
+
+        db.session.close()
+        pending = _PendingInsert(values, after)
+        self._ensure_committer()
+        self._queue.put(pending)
+        if not pending.done.wait(WAIT_TIMEOUT):
+            raise TimeoutError('Tempo esgotado aguardando a gravação em lote')
+        if pending.error is not None:
+            raise pending.error
+        return pending.id
+
+    def _insert_inline(self, values, after):
+        row = self.model(**values)
+        db.session.add(row)
+        if after is not None:
+            after()
+        db.session.commit()
+        return row.id
+
+    def _ensure_committer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            with self.app.app_context():
+                try:
+                    statement = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+                    ids = db.session.scalars(statement, [pending.values for pending in batch]).all()
+                    for pending, row_id in zip(batch, ids):
+                        pending.id = row_id
+                        if pending.after is not None:
+                            pending.after()
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            if len(batch) > 1:
+                # Uma linha inválida não derruba as demais: regrava uma a uma
+                for pending in batch:
+                    self._commit([pending])
+                return
+            logger.exception('Falha ao gravar inserção em lote')
+            batch[0].id = None
+            batch[0].error = e
+        else:
+            self.batches += 1
+            self.rows += len(batch)
+        for pending in batch:
+            pending.done.set()
+
+
+session_inserts = GroupCommitter(SimulationSession)
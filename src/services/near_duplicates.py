@@ -0,0 +1,134 @@
+"""
+Near-duplicate question detection.
+
+Each question (text + options) is reduced to word shingles and a MinHash
+signature. Locality-sensitive hashing over signature bands yields candidate
+pairs without comparing every pair of questions; candidates whose estimated
+Jaccard similarity reaches the threshold are merged into clusters.
+"""
+
+import random
+import re
+import zlib
+
+from src.models.user import db
+from src.models.question import Question
+from src.services.cache import route_cache
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+MAX_PAIRWISE_BUCKET = 50
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Coeficientes fixos para que as assinaturas sejam iguais entre processos
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text):
+    """Word n-grams of ``text`` ignoring case and numbers ("Questão 12: ...")"""
+    tokens = [token for token in _TOKEN.findall(text.casefold()) if not token.isdigit()]
+    if len(tokens) < SHINGLE_SIZE:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set] or [0]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimated_similarity(signature_a, signature_b):
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERMUTATIONS
+
+
+class DuplicateIndex:
+    """Clusters of near-duplicate questions for one set of questions"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.signatures = {}
+        self.clusters = []  # listas de IDs, apenas clusters com 2+ questões
+        self.cluster_of = {}  # question_id -> ID representativo do cluster
+
+    def build(self, documents):
+        """``documents`` yields ``(question_id, text)``"""
+        buckets = {}
+        for question_id, text in documents:
+            signature = minhash(shingles(text))
+            self.signatures[question_id] = signature
+            for band in range(BANDS):
+                start = band * ROWS_PER_BAND
+                buckets.setdefault((band, signature[start:start + ROWS_PER_BAND]), []).append(question_id)
+
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        checked = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Buckets muito cheios são comparados só contra o primeiro membro
+            if len(members) > MAX_PAIRWISE_BUCKET:
+                pairs = ((members[0], other) for other in members[1:])
+            else:
+                pairs = ((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+            for a, b in pairs:
+                pair = (a, b) if a < b else (b, a)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if estimated_similarity(self.signatures[a], self.signatures[b]) >= self.threshold:
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for question_id in list(parent):
+            groups.setdefault(find(question_id), []).append(question_id)
+        for root, members in groups.items():
+            if len(members) > 1:
+                members.sort()
+                self.clusters.append(members)
+                for question_id in members:
+                    self.cluster_of[question_id] = members[0]
+        self.clusters.sort(key=len, reverse=True)
+        return self
+
+
+def _question_documents(certification):
+    rows = db.session.query(Question.id, Question.question_text, Question.options).filter(
+        Question.certification == certification
+    ).order_by(Question.id)
+    for question_id, question_text, options in rows:
+        yield question_id, f'{question_text} {options}'
+
+
+def build_index(certification, threshold=DEFAULT_THRESHOLD):
+    return DuplicateIndex(threshold).build(_question_documents(certification))
+
+
+def cluster_map(certification, threshold=DEFAULT_THRESHOLD):
+    """``{question_id: cluster_id}`` for the certification, cached until it changes"""
+    return route_cache.get_or_compute(
+        f'duplicate_clusters:{certification}:{threshold}',
+        lambda: build_index(certification, threshold).cluster_of,
+        ttl=3600,
+        tags=(f'questions:{certification}',)
+    )
@@ -0,0 +1,230 @@
+"""
+Bulk question import.
+
+Records arrive as NDJSON or as a JSON array and are parsed incrementally from
+the request stream, validated and normalized one by one, deduplicated on
+(certification, text hash) and inserted in chunked transactions.
+"""
+
+import codecs
+import hashlib
+import json
+import re
+
+from sqlalchemy import insert
+
+from src.models.user import db
+from src.models.question import Question
+
+DEFAULT_CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+
+# Limita o tamanho do relatório de erros devolvido ao cliente
+MAX_REPORTED_ERRORS = 1000
+
+QUESTION_TYPES = ('multiple_choice', 'multiple_response')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+REQUIRED_FIELDS = ('certification', 'domain', 'question_text', 'question_type', 'options', 'correct_answers', 'explanation')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class ImportRecordError(ValueError):
+    """A single record failed validation"""
+
+
+def normalize_answers(answers):
+    """Normalize answers to ensure consistency"""
+    if isinstance(answers, list):
+        return answers
+    elif isinstance(answers, str):
+        return [answers]
+    else:
+        return [str(answers)]
+
+
+def text_hash(question_text):
+    """Hash used to detect the same question text (ignoring case and spacing)"""
+    normalized = _WHITESPACE.sub(' ', question_text).strip().casefold()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def normalize_record(record):
+    """Validates a raw record and returns the column values for ``questions``"""
+    if not isinstance(record, dict):
+        raise ImportRecordError('registro deve ser um objeto JSON')
+
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '', [])]
+    if missing:
+        raise ImportRecordError(f"campos obrigatórios ausentes: {', '.join(missing)}")
+
+    for field in ('certification', 'domain', 'question_text', 'question_type', 'explanation'):
+        if not isinstance(record[field], str):
+            raise ImportRecordError(f'{field} deve ser texto')
+
+    if record['question_type'] not in QUESTION_TYPES:
+        raise ImportRecordError(f"question_type inválido: {record['question_type']}")
+
+    options = record['options']
+    if not isinstance(options, list) or not all(isinstance(option, str) for option in options):
+        raise ImportRecordError('options deve ser uma lista de textos')
+
+    difficulty = record.get('difficulty') or 'medium'
+    if difficulty not in DIFFICULTIES:
+        raise ImportRecordError(f'difficulty inválida: {difficulty}')
+
+    return {
+        'certification': record['certification'].strip(),
+        'domain': record['domain'].strip(),
+        'question_text': record['question_text'].strip(),
+        'question_type': record['question_type'],
+        'options': json.dumps(options),
+        'correct_answers': json.dumps(normalize_answers(record['correct_answers'])),
+        'explanation': record['explanation'],
+        'difficulty': difficulty
+    }
+
+
+def iter_ndjson(stream):
+    """Yields ``(row, record_or_error)`` for each non-empty line of ``stream``"""
+    for row, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, ImportRecordError(f'JSON inválido: {e}')
+
+
+def iter_json_array(stream):
+    """Yields ``(row, record)`` from a JSON array without buffering the whole body"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    eof = False
+    position = 0
+    row = 0
+    started = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+        position = 0
+
+    while True:
+        skip = ' \t\r\n,' if started else ' \t\r\n'
+        while position < len(buffer) and buffer[position] in skip:
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ImportRecordError('array JSON incompleto')
+            fill()
+            continue
+
+        if not started:
+            if buffer[position] != '[':
+                raise ImportRecordError('corpo deve ser um array JSON ou NDJSON')
+            started = True
+            position += 1
+            continue
+
+        if buffer[position] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            if eof:
+                raise ImportRecordError(f'JSON inválido: {e}') from e
+            fill()
+            continue
+
+        row += 1
+        position = end
+        yield row, record
+
+
+class BulkImporter:
+    """Validates, deduplicates and inserts records in chunked transactions"""
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+        self.certifications = set()
+        self._known_hashes = {}
+        self._pending = []
+
+    def _hashes(self, certification):
+        hashes = self._known_hashes.get(certification)
+        if hashes is None:
+            rows = db.session.query(Question.question_text).filter(Question.certification == certification)
+            hashes = self._known_hashes[certification] = {text_hash(text) for (text,) in rows}
+        return hashes
+
+    def _error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def add(self, row, record):
+        if isinstance(record, Exception):
+            self._error(row, str(record))
+            return
+        try:
+            values = normalize_record(record)
+        except ImportRecordError as e:
+            self._error(row, str(e))
+            return
+
+        hashes = self._hashes(values['certification'])
+        digest = text_hash(values['question_text'])
+        if digest in hashes:
+            self.duplicates += 1
+            return
+        hashes.add(digest)
+
+        self._pending.append((row, values))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            db.session.execute(insert(Question), [values for _, values in pending])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for row, values in pending:
+                self._known_hashes[values['certification']].discard(text_hash(values['question_text']))
+                self._error(row, f'falha ao inserir lote: {e}')
+            return
+        self.imported += len(pending)
+        self.certifications.update(values['certification'] for _, values in pending)
+
+    def run(self, records):
+        try:
+            for row, record in records:
+                self.add(row, record)
+        except ImportRecordError as e:
+            # Erro estrutural no corpo: interrompe, mantendo os lotes já gravados
+            self._error(None, str(e))
+        self.flush()
+        return self.report()
+
+    def report(self):
+        return {
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'certifications': sorted(self.certifications)
+        }
@@ -0,0 +1,183 @@
+"""
+Compact on-disk question pack format.
+
+A pack is a single file holding length-prefixed JSON records grouped by
+certification, followed by an offset index and a certification table:
+
+    header      magic "QPAK", version (u16), flags (u16), record count (u32),
+                index offset (u64), certification table offset (u64)
+    records     [length (u32)][UTF-8 JSON record] ...
+    index       per record: question id (u32), record offset (u64);
+                ordered by certification, then id
+    cert table  count (u16), then per certification: name length (u16),
+                name, first index entry (u32), entry count (u32)
+
+``QuestionPack`` memory-maps the file and decodes records lazily, so a
+single question can be read by id, or one certification streamed, without
+parsing the rest of the pack. All integers are little-endian.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b'QPAK'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIQQ')
+_LENGTH = struct.Struct('<I')
+_INDEX_ENTRY = struct.Struct('<IQ')
+_U16 = struct.Struct('<H')
+_CERT_RANGE = struct.Struct('<II')
+
+RECORD_FIELDS = (
+    'certification', 'domain', 'question_text', 'question_type',
+    'options', 'correct_answers', 'explanation', 'difficulty'
+)
+
+
+class QuestionPackError(ValueError):
+    """The file is not a readable question pack"""
+
+
+def write_pack(path, questions):
+    """Writes ``questions`` (dicts with an optional ``id``) to a pack at ``path``
+
+    Records without an id are numbered sequentially. The file is written to a
+    temporary path and renamed, so readers never see a partial pack.
+    """
+    by_certification = {}
+    next_id = 1
+    for q_data in questions:
+        question_id = q_data.get('id') or next_id
+        next_id = max(next_id, question_id) + 1
+        record = {field: q_data.get(field) for field in RECORD_FIELDS}
+        record['id'] = question_id
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        by_certification.setdefault(record['certification'], []).append((question_id, payload))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\0' * _HEADER.size)
+            index = []
+            cert_ranges = []
+            for certification in sorted(by_certification):
+                records = sorted(by_certification[certification])
+                cert_ranges.append((certification, len(index), len(records)))
+                for question_id, payload in records:
+                    index.append((question_id, f.tell()))
+                    f.write(_LENGTH.pack(len(payload)))
+                    f.write(payload)
+
+            index_offset = f.tell()
+            for question_id, offset in index:
+                f.write(_INDEX_ENTRY.pack(question_id, offset))
+
+            cert_table_offset = f.tell()
+            f.write(_U16.pack(len(cert_ranges)))
+            for certification, first, count in cert_ranges:
+                name = certification.encode('utf-8')
+                f.write(_U16.pack(len(name)))
+                f.write(name)
+                f.write(_CERT_RANGE.pack(first, count))
+
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, len(index), index_offset, cert_table_offset))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sum(len(records) for records in by_certification.values())
+
+
+class QuestionPack:
+    """Read-only, memory-mapped view of a question pack"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise QuestionPackError(f'{path}: arquivo vazio') from e
+
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise QuestionPackError(f'{path}: cabeçalho incompleto')
+        magic, version, _, self.count, self._index_offset, cert_table_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise QuestionPackError(f'{path}: não é um question pack')
+        if version != VERSION:
+            self.close()
+            raise QuestionPackError(f'{path}: versão {version} não suportada')
+
+        self._cert_ranges = {}
+        position = cert_table_offset
+        (cert_count,) = _U16.unpack_from(self._map, position)
+        position += _U16.size
+        for _ in range(cert_count):
+            (name_length,) = _U16.unpack_from(self._map, position)
+            position += _U16.size
+            name = bytes(self._map[position:position + name_length]).decode('utf-8')
+            position += name_length
+            self._cert_ranges[name] = _CERT_RANGE.unpack_from(self._map, position)
+            position += _CERT_RANGE.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def certifications(self):
+        return list(self._cert_ranges)
+
+    def _entry(self, position):
+        return _INDEX_ENTRY.unpack_from(self._map, self._index_offset + position * _INDEX_ENTRY.size)
+
+    def _record(self, offset):
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        return json.loads(self._map[start:start + length])
+
+    def iter_certification(self, certification):
+        """Yields the records of one certification, decoding them one at a time"""
+        first, count = self._cert_ranges.get(certification, (0, 0))
+        for position in range(first, first + count):
+            yield self._record(self._entry(position)[1])
+
+    def __iter__(self):
+        for certification in self._cert_ranges:
+            yield from self.iter_certification(certification)
+
+    def get(self, question_id):
+        """Returns the record with ``question_id`` (binary search per certification)"""
+        for first, count in self._cert_ranges.values():
+            low, high = first, first + count
+            while low < high:
+                middle = (low + high) // 2
+                entry_id, offset = self._entry(middle)
+                if entry_id == question_id:
+                    return self._record(offset)
+                if entry_id < question_id:
+                    low = middle + 1
+                else:
+                    high = middle
+        return None
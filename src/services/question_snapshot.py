@@ -0,0 +1,87 @@
+"""
+Prebuilt question bank snapshots.
+
+A snapshot is a standalone SQLite file holding only the question bank
+(``questions`` and ``seed_manifest``), with the read indexes and the
+full-text index already built, statistics gathered by ``ANALYZE`` and the
+file compacted by ``VACUUM``. Bringing up a new node is a file copy; the app
+opens it read-only through ``QUESTION_BANK_SNAPSHOT`` while sessions keep
+going to the writable database.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from src.services.search_index import FTS_TABLE, _SCHEMA as FTS_SCHEMA
+
+BANK_TABLES = ('questions', 'seed_manifest')
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_questions_certification_domain ON questions (certification, domain)',
+    'CREATE INDEX IF NOT EXISTS ix_questions_certification_difficulty ON questions (certification, difficulty)'
+]
+
+
+class SnapshotError(RuntimeError):
+    """The snapshot could not be built or opened"""
+
+
+def snapshot_uri(path):
+    """SQLAlchemy URI that opens a snapshot read-only and without locking
+
+    ``immutable=1`` tells SQLite the file never changes, so readers in any
+    number of processes skip file locks and change detection entirely.
+    """
+    return f"sqlite:///file:{os.path.abspath(path)}?mode=ro&immutable=1&uri=true"
+
+
+def build_snapshot(source_path, snapshot_path):
+    """Copies the question bank of ``source_path`` into an optimized snapshot
+
+    The file is built next to ``snapshot_path`` and renamed into place, so a
+    running reader never sees a partial snapshot. Returns the question count.
+    """
+    if not os.path.exists(source_path):
+        raise SnapshotError(f'{source_path}: banco de origem não encontrado')
+
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(f'file:{tmp_path}', uri=True, isolation_level=None)
+        try:
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('ATTACH DATABASE ? AS source', (f'file:{source_path}?mode=ro',))
+            connection.execute('BEGIN')
+            for table in BANK_TABLES:
+                row = connection.execute(
+                    "SELECT sql FROM source.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+                if row is None:
+                    raise SnapshotError(f'{source_path}: tabela {table} não encontrada')
+                connection.execute(row[0])
+                connection.execute(f'INSERT INTO main.{table} SELECT * FROM source.{table}')
+            for statement in INDEXES + FTS_SCHEMA:
+                connection.execute(statement)
+            connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+            connection.execute('COMMIT')
+            connection.execute('DETACH DATABASE source')
+
+            (count,) = connection.execute('SELECT COUNT(*) FROM questions').fetchone()
+            connection.execute('ANALYZE')
+            connection.execute('VACUUM')
+            # Modo de journal persistido no arquivo: leitores read-only não precisam de -wal/-shm
+            connection.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            connection.close()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
@@ -0,0 +1,206 @@
+"""
+Write-once cache for the results of completed simulations.
+
+A completed session never changes, so its results response is encoded and
+compressed once (at submit time) and kept in an LRU memory tier backed by
+an on-disk tier. Repeat views are a single lookup.
+
+Fields that do change after submit (the percentile rank) are not cached.
+An entry is the raw deflate stream of the JSON object without its closing
+brace, ended by a sync flush, plus its CRC-32 and length. ``response``
+compresses the live fields and the closing brace as a short tail and
+frames both as one gzip member, so serving never recompresses the body.
+
+Entries are keyed by session id plus the session's ``completed_at``: a
+resubmission, or a new session that reuses the id of a deleted one, never
+sees an older entry. The disk tier is capped at ``RESULTS_CACHE_MAX_BYTES``,
+evicting the oldest files first.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import Response, current_app
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_LEVEL = 6
+SUFFIX = '.json.deflate'
+
+# CRC-32 e tamanho do JSON guardado, na frente do stream deflate
+ENTRY_HEADER = struct.Struct('<II')
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def version(completed_at):
+    """Cache version of a session: its completion time in microseconds"""
+    return int(completed_at.timestamp() * 1000000)
+
+
+def _deflate():
+    return zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+
+def encode(payload):
+    """Entry for ``payload``: its JSON up to (not including) the closing brace"""
+    head = current_app.json.dumps(payload).encode('utf-8')[:-1]
+    compressor = _deflate()
+    body = compressor.compress(head) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return ENTRY_HEADER.pack(zlib.crc32(head), len(head)) + body
+
+
+def _tail(fields):
+    dumps = current_app.json.dumps
+    return ''.join(f',{dumps(key)}:{dumps(value)}' for key, value in fields.items()).encode('utf-8') + b'}'
+
+
+def gzip_body(data, fields):
+    """gzip member of the entry followed by ``fields``"""
+    crc, length = ENTRY_HEADER.unpack_from(data)
+    tail = _tail(fields)
+    compressor = _deflate()
+    return b''.join((
+        GZIP_HEADER, memoryview(data)[ENTRY_HEADER.size:], compressor.compress(tail), compressor.flush(),
+        ENTRY_HEADER.pack(zlib.crc32(tail, crc), (length + len(tail)) & 0xffffffff)
+    ))
+
+
+def json_body(data, fields):
+    """Uncompressed JSON of the entry followed by ``fields``"""
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(memoryview(data)[ENTRY_HEADER.size:]) + _tail(fields)
+
+
+class ResultsCache:
+    """Two-tier (memory LRU + disk) store of compressed results responses"""
+
+    def __init__(self, app=None, max_entries=256, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = None
+        self._memory = OrderedDict()
+        self._files = OrderedDict()  # nome do arquivo -> tamanho, do mais antigo ao mais novo
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RESULTS_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('RESULTS_CACHE_MAX_BYTES', self.max_bytes)
+        self.directory = app.config.get('RESULTS_CACHE_DIR')
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    def _scan(self):
+        """Indexes the files already on disk, oldest first"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        with self._lock:
+            self._files = OrderedDict((name, size) for _, name, size in sorted(entries))
+            self._disk_bytes = sum(self._files.values())
+        self._evict()
+
+    @staticmethod
+    def _name(session_id, completed_at):
+        return f'{int(session_id)}-{version(completed_at)}{SUFFIX}'
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Removes the oldest files while the disk tier is over its size limit"""
+        victims = []
+        with self._lock:
+            while self._disk_bytes > self.max_bytes and self._files:
+                name, size = self._files.popitem(last=False)
+                self._disk_bytes -= size
+                victims.append(name)
+        for name in victims:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def get(self, session_id, completed_at):
+        """Returns the cached entry, or ``None`` on a miss"""
+        key = self._name(session_id, completed_at)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        self._remember(key, data)
+        return data
+
+    def put(self, session_id, completed_at, payload):
+        """Encodes and stores ``payload``; returns the entry"""
+        key = self._name(session_id, completed_at)
+        data = encode(payload)
+        self._remember(key, data)
+
+        if self.directory:
+            # Escrita atômica: arquivo temporário + rename
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self.directory, key))
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            with self._lock:
+                self._disk_bytes += len(data) - self._files.pop(key, 0)
+                self._files[key] = len(data)
+            self._evict()
+        return data
+
+    def load(self, session_id, completed_at):
+        """Returns the decoded payload, or ``None`` on a miss"""
+        data = self.get(session_id, completed_at)
+        return None if data is None else current_app.json.loads(json_body(data, {}))
+
+    def clear(self):
+        """Drops every entry, in memory and on disk (sessions were deleted)"""
+        with self._lock:
+            self._memory.clear()
+            self._files.clear()
+            self._disk_bytes = 0
+        if self.directory and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith((SUFFIX, '.json.gz', '.tmp')):
+                    os.remove(entry.path)
+
+    @staticmethod
+    def response(data, request, **fields):
+        """Serves an entry with ``fields`` appended, decompressing only for clients without gzip"""
+        if request.accept_encodings['gzip'] > 0:
+            response = Response(gzip_body(data, fields), mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(json_body(data, fields), mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+results_cache = ResultsCache()
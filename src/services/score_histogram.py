@@ -0,0 +1,166 @@
+"""
+Per-certification score histograms for percentile ranks.
+
+``score_histograms`` has one row per (certification, score point) counting
+the completed sessions with that score. Submitting adds one to the
+session's point in the same transaction as the session update (a
+resubmission moves it from the previous score), so ranks never require
+sorting or scanning the sessions.
+
+Each process keeps a certification's histogram in memory with its prefix
+sums over the score points, so a percentile rank is one lookup. Local
+submissions are added in place; the copy is reloaded after
+``HISTOGRAM_TTL`` seconds to pick up other processes. ``rebuild``
+recomputes the table from the sessions with one ``GROUP BY``.
+
+The full results response is cached when it is submitted, so the rank it
+carries is the one at submit time. Paged results always use the current
+histogram.
+"""
+
+import threading
+import time
+from array import array
+from itertools import accumulate
+
+from sqlalchemy import cast, func, insert, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models.user import db
+from src.models.question import ScoreHistogramBin, SimulationSession
+
+MAX_SCORE = 1000
+HISTOGRAM_TTL = 60
+
+
+def point(score):
+    return min(max(int(round(score or 0)), 0), MAX_SCORE)
+
+
+def deltas(certification, score, previous_score=None):
+    """Histogram rows to add for a submission (and to remove for the score it replaces)"""
+    rows = [{'certification': certification, 'score': point(score), 'count': 1}]
+    if previous_score is not None:
+        rows.append({'certification': certification, 'score': point(previous_score), 'count': -1})
+    return rows
+
+
+def apply(rows):
+    """Adds ``rows`` to the table inside the caller's transaction"""
+    totals = {}
+    for row in rows:
+        key = (row['certification'], row['score'])
+        totals[key] = totals.get(key, 0) + row['count']
+    values = [
+        {'certification': certification, 'score': score, 'count': count}
+        for (certification, score), count in totals.items() if count
+    ]
+    if not values:
+        return
+    statement = sqlite_insert(ScoreHistogramBin)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=['certification', 'score'],
+            set_={'count': ScoreHistogramBin.count + statement.excluded.count}
+        ),
+        values
+    )
+
+
+class _Histogram:
+    __slots__ = ('counts', 'below', 'total', 'loaded_at')
+
+    def __init__(self, counts, loaded_at):
+        self.counts = counts
+        self.loaded_at = loaded_at
+        self._sum()
+
+    def _sum(self):
+        # below[i]: sessões com nota menor que i
+        self.below = array('l', accumulate(self.counts[:-1], initial=0))
+        self.total = self.below[-1] + self.counts[-1]
+
+    def add(self, score, count):
+        self.counts[score] += count
+        self._sum()
+
+
+class ScoreHistograms:
+    """In-memory prefix-summed histograms, one per certification"""
+
+    def __init__(self, ttl=HISTOGRAM_TTL):
+        self.ttl = ttl
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _load(self, certification):
+        counts = array('l', bytes(array('l').itemsize * (MAX_SCORE + 1)))
+        for score, count in db.session.query(ScoreHistogramBin.score, ScoreHistogramBin.count).filter(
+            ScoreHistogramBin.certification == certification
+        ):
+            counts[score] = count
+        return _Histogram(counts, time.monotonic())
+
+    def histogram(self, certification):
+        with self._lock:
+            histogram = self._histograms.get(certification)
+            if histogram is not None and time.monotonic() - histogram.loaded_at < self.ttl:
+                return histogram
+        histogram = self._load(certification)
+        with self._lock:
+            self._histograms[certification] = histogram
+        return histogram
+
+    def record(self, rows, committed=True):
+        """Adds ``rows`` to the in-memory histograms.
+
+        Committed rows only update histograms already in memory (a fresh load
+        includes them); rows still in the write-behind queue are added after
+        loading, since the table does not have them yet.
+        """
+        if not committed:
+            for certification in {row['certification'] for row in rows}:
+                self.histogram(certification)
+        with self._lock:
+            for row in rows:
+                histogram = self._histograms.get(row['certification'])
+                if histogram is not None:
+                    histogram.add(row['score'], row['count'])
+
+    def percentile_rank(self, certification, score):
+        """Share of completed sessions scoring below ``score`` (ties count half), in percent"""
+        histogram = self.histogram(certification)
+        if not histogram.total:
+            return None
+        score = point(score)
+        return round((histogram.below[score] + histogram.counts[score] / 2) / histogram.total * 100, 1)
+
+    def invalidate(self, certification=None):
+        with self._lock:
+            if certification is None:
+                self._histograms.clear()
+            else:
+                self._histograms.pop(certification, None)
+
+    def rebuild(self):
+        """Recomputes every histogram from the completed sessions; returns the number of sessions"""
+        score = cast(func.round(SimulationSession.score), Integer)
+        rows = db.session.query(SimulationSession.certification, score, func.count(SimulationSession.id)).filter(
+            SimulationSession.completed_at.isnot(None)
+        ).group_by(SimulationSession.certification, score).all()
+        db.session.query(ScoreHistogramBin).delete(synchronize_session=False)
+        values = {}
+        for certification, value, count in rows:
+            key = (certification, point(value))
+            values[key] = values.get(key, 0) + count
+        if values:
+            db.session.execute(insert(ScoreHistogramBin), [
+                {'certification': certification, 'score': value, 'count': count}
+                for (certification, value), count in values.items()
+            ])
+        db.session.commit()
+        self.invalidate()
+        return sum(values.values())
+
+
+score_histograms = ScoreHistograms()
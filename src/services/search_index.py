@@ -0,0 +1,132 @@
+"""
+Full-text search over the question bank.
+
+Backed by an SQLite FTS5 external-content table over ``question_text``,
+``options``, ``explanation`` and ``domain``. Triggers on ``questions`` keep the
+index up to date incrementally, so questions added through the API, the bulk
+import or the seeder become searchable in the same transaction.
+"""
+
+import json
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.models.question import Question
+
+FTS_TABLE = 'questions_fts'
+
+# Pesos do bm25 por coluna: question_text, options, explanation, domain
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 3.0)
+
+MAX_LIMIT = 100
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        question_text, options, explanation, domain,
+        content='questions', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, question_text, options, explanation, domain)
+        VALUES (new.id, new.question_text, new.options, new.explanation, new.domain);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text, options, explanation, domain)
+        VALUES ('delete', old.id, old.question_text, old.options, old.explanation, old.domain);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text, options, explanation, domain)
+        VALUES ('delete', old.id, old.question_text, old.options, old.explanation, old.domain);
+        INSERT INTO {FTS_TABLE}(rowid, question_text, options, explanation, domain)
+        VALUES (new.id, new.question_text, new.options, new.explanation, new.domain);
+    END"""
+]
+
+
+class SearchUnavailableError(Exception):
+    """Raised when the SQLite build has no FTS5 support"""
+
+
+def _engine():
+    return db.session.get_bind(mapper=Question.__mapper__)
+
+
+def ensure_index():
+    """Creates the FTS table and triggers, rebuilding the index when new"""
+    engine = _engine()
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first()
+            for statement in _SCHEMA:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError:
+        return False
+    return True
+
+
+def rebuild_index():
+    with _engine().begin() as connection:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(query):
+    """Turns free text into an FTS5 query: all terms required, last one as prefix"""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(query, certification=None, domain=None, difficulty=None, limit=20, offset=0):
+    """Returns ranked matches (best first) without the correct answers"""
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    filters = []
+    params = {'match': match, 'limit': min(max(limit, 1), MAX_LIMIT), 'offset': max(offset, 0)}
+    for column, value in (('certification', certification), ('domain', domain), ('difficulty', difficulty)):
+        if value:
+            filters.append(f'AND q.{column} = :{column}')
+            params[column] = value
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    statement = text(f"""
+        SELECT q.id, q.certification, q.domain, q.question_text, q.question_type, q.options, q.difficulty,
+               bm25({FTS_TABLE}, {weights}) AS rank,
+               snippet({FTS_TABLE}, -1, '[', ']', '…', 12) AS snippet
+        FROM {FTS_TABLE}
+        JOIN questions q ON q.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+        {' '.join(filters)}
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """)
+
+    try:
+        rows = db.session.execute(statement, params, bind_arguments={'mapper': Question.__mapper__})
+    except OperationalError as e:
+        raise SearchUnavailableError(str(e)) from e
+
+    results = []
+    for row in rows:
+        item = dict(row._mapping)
+        item['options'] = json.loads(item['options'])
+        # bm25 devolve valores negativos: quanto menor, mais relevante
+        item['score'] = round(-item.pop('rank'), 4)
+        results.append(item)
+    return results
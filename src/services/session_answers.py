@@ -0,0 +1,132 @@
+"""
+Indexed per-question answers of completed simulations.
+
+Submitting a session also writes one ``session_answers`` row per question:
+position in the exam, question id, domain, correctness and the selected
+options. The results review pages, filters (only incorrect, by domain) and
+projects over these rows with indexed queries. Question text, options,
+explanation and answer key come from the cached answer keys of the
+certification, so the session blob is never deserialized for a page.
+"""
+
+import json
+
+from sqlalchemy import insert
+
+from src.models.user import db
+from src.models.question import Question, SessionAnswer
+from src.services.cache import route_cache
+
+ANSWER_KEYS_TTL = 3600
+
+RESULT_FIELDS = (
+    'position', 'question_id', 'domain', 'is_correct', 'user_answer', 'user_answers',
+    'correct_answers', 'question_text', 'options', 'explanation'
+)
+
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+
+
+def answer_keys(certification):
+    """``{question_id: grading data}`` for a certification, cached until its questions change"""
+    def load():
+        rows = db.session.query(
+            Question.id, Question.question_text, Question.options, Question.correct_answers,
+            Question.explanation, Question.domain
+        ).filter(Question.certification == certification)
+        return {
+            question_id: {
+                'question_text': question_text,
+                'options': json.loads(options),
+                'correct_answers': json.loads(correct_answers),
+                'explanation': explanation,
+                'domain': domain
+            }
+            for question_id, question_text, options, correct_answers, explanation, domain in rows
+        }
+
+    return route_cache.get_or_compute(
+        f'answer_keys:{certification}', load, ttl=ANSWER_KEYS_TTL, tags=(f'questions:{certification}',)
+    )
+
+
+def answer_row(session_id, position, question_id, domain, is_correct, user_answer):
+    return {
+        'session_id': session_id,
+        'position': position,
+        'question_id': question_id,
+        'domain': domain,
+        'is_correct': is_correct,
+        'user_answer': json.dumps(user_answer)
+    }
+
+
+def store(session_ids, rows):
+    """Replaces the answer rows of ``session_ids`` (a resubmission overwrites them)"""
+    db.session.query(SessionAnswer).filter(SessionAnswer.session_id.in_(session_ids)).delete(
+        synchronize_session=False
+    )
+    if rows:
+        db.session.execute(insert(SessionAnswer), rows)
+
+
+def has_answers(session_id):
+    return db.session.query(SessionAnswer.id).filter(SessionAnswer.session_id == session_id).first() is not None
+
+
+def project(item, fields):
+    return {field: item[field] for field in fields if field in item}
+
+
+def page(session, page=1, per_page=DEFAULT_PER_PAGE, only_incorrect=False, domain=None, fields=RESULT_FIELDS):
+    """Returns ``(total, items)`` for one page of a session's answers"""
+    query = db.session.query(
+        SessionAnswer.position, SessionAnswer.question_id, SessionAnswer.domain,
+        SessionAnswer.is_correct, SessionAnswer.user_answer
+    ).filter(SessionAnswer.session_id == session.id)
+    if only_incorrect:
+        query = query.filter(SessionAnswer.is_correct.is_(False))
+    if domain:
+        query = query.filter(SessionAnswer.domain == domain)
+
+    total = query.order_by(None).count()
+    rows = query.order_by(SessionAnswer.position).limit(per_page).offset((page - 1) * per_page).all()
+
+    # Texto, alternativas e gabarito só são buscados se algum desses campos foi pedido
+    needs_keys = any(field in fields for field in ('correct_answers', 'question_text', 'options', 'explanation'))
+    keys = answer_keys(session.certification) if needs_keys else {}
+
+    items = []
+    for position, question_id, question_domain, is_correct, user_answer in rows:
+        user_answer = json.loads(user_answer)
+        item = {
+            'position': position,
+            'question_id': question_id,
+            'domain': question_domain,
+            'is_correct': is_correct,
+            'user_answer': user_answer,
+            'user_answers': user_answer
+        }
+        key = keys.get(question_id)
+        if key is not None:
+            item.update(
+                question_text=key['question_text'],
+                options=key['options'],
+                correct_answers=key['correct_answers'],
+                explanation=key['explanation']
+            )
+        items.append(project(item, fields))
+    return total, items
+
+
+def page_from_payload(questions_with_answers, page=1, per_page=DEFAULT_PER_PAGE, only_incorrect=False,
+                      domain=None, fields=RESULT_FIELDS):
+    """Same as ``page`` over an already built results list (sessions without answer rows)"""
+    items = [
+        dict(item, position=position)
+        for position, item in enumerate(questions_with_answers)
+        if (not only_incorrect or not item.get('is_correct')) and (not domain or item.get('domain') == domain)
+    ]
+    start = (page - 1) * per_page
+    return len(items), [project(item, fields) for item in items[start:start + per_page]]
@@ -0,0 +1,134 @@
+"""
+In-memory manifest of the static folder.
+
+The manifest is built once at startup so serving an asset never touches the
+filesystem to check whether it exists. Fingerprinted assets (``main.3f2a9c1b.js``,
+``index-Bq1Ux2c3.js``) get long-lived immutable caching, everything else is
+revalidated through its ETag, and precompressed ``.br``/``.gz`` siblings are
+served when the client accepts them.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, send_file
+
+# Arquivos maiores que isso são servidos do disco em vez da memória
+MAX_IN_MEMORY_SIZE = 1024 * 1024
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Encodings pré-comprimidos em ordem de preferência
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Só segmentos que são de fato um hash antes da extensão:
+# - hexadecimal com 8+ caracteres (e ao menos uma letra a-f): name.3f2a9c1b.js, name-3f2a9c1b.css
+# - base64url de bundler (Vite/Rollup) com 8+ caracteres, depois de ponto ou hífen: index-Bq1Ux2c3.js,
+#   name.Bq1Ux2c3.js; exige dígito, maiúscula e minúscula e nenhuma sequência de 4 minúsculas
+# Nomes como chart-utils-v2.js, background-1920x1080.jpg ou App-MyComponent2.js continuam sendo revalidados
+FINGERPRINT_PATTERN = re.compile(
+    r'(?:[.-](?=\d*[a-f])[0-9a-f]{8,}'
+    r'|[.-](?=[A-Za-z_-]*\d)(?=[0-9a-z_-]*[A-Z])(?=[0-9A-Z_-]*[a-z])(?![A-Za-z0-9_-]*[a-z]{4})[A-Za-z0-9_-]{8,})'
+    r'\.[A-Za-z0-9]+$'
+)
+
+
+class StaticAsset:
+    """A single file (plus its precompressed variants) known to the manifest"""
+
+    def __init__(self, path, filename, mimetype, fingerprinted):
+        self.path = path
+        self.filename = filename
+        self.mimetype = mimetype
+        self.fingerprinted = fingerprinted
+        self.size = os.path.getsize(filename)
+        self.etag = self._hash_file(filename)
+        self.data = self._read(filename)
+        self.variants = {}
+
+    @staticmethod
+    def _hash_file(filename):
+        digest = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:20]
+
+    def _read(self, filename):
+        if self.size > MAX_IN_MEMORY_SIZE:
+            return None
+        with open(filename, 'rb') as f:
+            return f.read()
+
+    @property
+    def cache_control(self):
+        return IMMUTABLE_CACHE_CONTROL if self.fingerprinted else REVALIDATE_CACHE_CONTROL
+
+
+class StaticAssetManifest:
+    """Maps request paths to assets loaded from ``root`` at build time"""
+
+    def __init__(self, root, index='index.html'):
+        self.root = root
+        self.index_name = index
+        self.assets = {}
+        self.build()
+
+    @property
+    def index(self):
+        return self.assets.get(self.index_name)
+
+    def build(self):
+        """(Re)builds the manifest from the static folder"""
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for name in filenames:
+                    if name.startswith('.'):
+                        continue
+                    filename = os.path.join(dirpath, name)
+                    path = os.path.relpath(filename, self.root).replace(os.sep, '/')
+                    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                    fingerprinted = bool(FINGERPRINT_PATTERN.search(name))
+                    assets[path] = StaticAsset(path, filename, mimetype, fingerprinted)
+
+        # Associa variantes .br/.gz ao arquivo original
+        for path, asset in assets.items():
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                variant = assets.get(path + suffix)
+                if variant is not None:
+                    asset.variants[encoding] = variant
+
+        self.assets = assets
+        return self
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def send(self, asset, request):
+        """Builds a conditional response for ``asset`` honoring Accept-Encoding"""
+        body = asset
+        encoding = None
+        for candidate, _ in PRECOMPRESSED_ENCODINGS:
+            variant = asset.variants.get(candidate)
+            if variant is not None and request.accept_encodings[candidate] > 0:
+                body, encoding = variant, candidate
+                break
+
+        if body.data is not None:
+            response = Response(body.data, mimetype=asset.mimetype)
+        else:
+            response = send_file(body.filename, mimetype=asset.mimetype, etag=False, conditional=False)
+
+        response.set_etag(body.etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        return response.make_conditional(request)
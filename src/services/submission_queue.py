@@ -0,0 +1,401 @@
+"""
+Write-behind queue for simulation submissions.
+
+Grading only needs the answer keys of a certification, which are cached, so
+``submit`` can answer immediately. With write-behind enabled the session
+update (with its ``session_answers`` and ``session_domain_scores`` rows)
+is appended to a local journal (fsync'd before the response), put on an
+in-process queue and written by a background thread in batched
+transactions, which also move the session in ``score_histograms``. The journal is replayed at startup, so an
+accepted submission survives a crash, and it is removed whenever every
+journaled update has been committed.
+
+The queue is bounded by the number of updates not yet committed: when it is
+full, ``submit`` waits up to ``SUBMISSION_ENQUEUE_TIMEOUT`` seconds and then
+raises ``SubmissionQueueFull``, which the route turns into a 503.
+
+Each process journals to its own file, ``submissions-<pid>.journal`` in
+``SUBMISSION_JOURNAL_DIR``, and holds an exclusive ``flock`` on it while it
+is open. At startup every journal nobody holds (left by a process that
+died) is replayed and removed; journals of live workers are skipped.
+
+Journal writes are buffered under the queue lock but fsync'd outside it,
+as a group: one submitter syncs everything written so far while the others
+wait for it, so concurrent submissions share a single flush.
+
+A batch that fails is retried one update at a time, up to
+``SUBMISSION_MAX_ATTEMPTS`` times each; an update that still fails is
+appended to ``submissions.deadletter`` with its error, so one bad update
+never blocks the writer (or the replay at startup). Those updates were
+already acknowledged to the client: each one is logged at ERROR and
+counted in ``stats()``.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+
+from src.models.user import db
+from src.models.question import SimulationSession
+from src.services.cache import route_cache
+from src.services import session_answers, domain_scores, score_histogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_ENQUEUE_TIMEOUT = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+
+JOURNAL_PREFIX = 'submissions-'
+JOURNAL_SUFFIX = '.journal'
+DEAD_LETTER_NAME = 'submissions.deadletter'
+
+
+class SubmissionQueueFull(Exception):
+    """Raised when too many submissions are waiting to be written"""
+
+
+def _encode(values):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+
+
+def _decode(values):
+    values = dict(values)
+    if values.get('completed_at'):
+        values['completed_at'] = datetime.fromisoformat(values['completed_at'])
+    return values
+
+
+class SubmissionQueue:
+    """Journaled, bounded write-behind queue for ``SimulationSession`` updates"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.journal_dir = None
+        self.max_attempts = DEFAULT_MAX_ATTEMPTS
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.enqueue_timeout = DEFAULT_ENQUEUE_TIMEOUT
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(DEFAULT_MAX_PENDING)
+        self._lock = threading.Lock()
+        self._pending = {}  # session_id -> valores ainda não gravados
+        self._journal = None
+        self._journal_path = None
+        self._written = 0  # sequência da última linha escrita no journal
+        self._synced = 0  # sequência até onde o journal já passou por fsync
+        self._sync_lock = threading.Lock()
+        self._dead_lettered = 0
+        self._thread = None
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get('SUBMISSION_WRITE_BEHIND'))
+        self.journal_dir = app.config.get('SUBMISSION_JOURNAL_DIR')
+        self.max_attempts = app.config.get('SUBMISSION_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.batch_size = app.config.get('SUBMISSION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = app.config.get('SUBMISSION_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.enqueue_timeout = app.config.get('SUBMISSION_ENQUEUE_TIMEOUT', DEFAULT_ENQUEUE_TIMEOUT)
+        self._slots = threading.BoundedSemaphore(app.config.get('SUBMISSION_MAX_PENDING', DEFAULT_MAX_PENDING))
+
+        # Journals órfãos são reaplicados mesmo com o modo desligado: nada aceito se perde
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self.replay_orphans()
+        atexit.register(self.shutdown)
+
+    def is_pending(self, session_id):
+        with self._lock:
+            return session_id in self._pending
+
+    def pending_values(self, session_id):
+        """Column values of a queued update not written yet, or ``None``"""
+        with self._lock:
+            item = self._pending.get(session_id)
+        return None if item is None else _decode(item['values'])
+
+    def pending_completed_at(self, session_id):
+        """``completed_at`` of a queued update not written yet, or ``None``"""
+        values = self.pending_values(session_id)
+        return None if values is None else values.get('completed_at')
+
+    def submit(self, session_id, values, answers=(), scores=()):
+        """Journals the update and queues it; returns once it is durable on disk"""
+        if not self._slots.acquire(timeout=self.enqueue_timeout):
+            raise SubmissionQueueFull()
+        item = {
+            'session_id': session_id,
+            'values': _encode(values),
+            'answers': list(answers),
+            'scores': list(scores)
+        }
+        try:
+            with self._lock:
+                sequence = self._append(item)
+                self._pending[session_id] = item
+            # Fora do lock: o item ainda não está na fila, então o journal não é removido antes
+            self._sync(sequence)
+        except BaseException:
+            with self._lock:
+                if self._pending.get(session_id) is item:
+                    del self._pending[session_id]
+            self._slots.release()
+            raise
+        self._ensure_writer()
+        self._queue.put(item)
+
+    @staticmethod
+    def _lock_current(f, path, blocking=True):
+        """Locks ``f``; ``False`` if it is held elsewhere or ``path`` no longer names that file"""
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _open_journal(self):
+        # O pid é lido aqui, não no init_app: workers criados por fork têm cada um o seu arquivo
+        path = os.path.join(self.journal_dir, f'{JOURNAL_PREFIX}{os.getpid()}{JOURNAL_SUFFIX}')
+        while True:
+            f = open(path, 'a', encoding='utf-8')
+            if self._lock_current(f, path):
+                self._journal, self._journal_path = f, path
+                return
+            # Arquivo removido por quem reaplicava um journal antigo com o mesmo pid
+            f.close()
+
+    def _append(self, item):
+        """Writes ``item`` to the journal (caller holds the lock); returns its sequence"""
+        if not self.journal_dir:
+            return 0
+        if self._journal is None:
+            self._open_journal()
+        self._journal.write(json.dumps(item, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        self._written += 1
+        return self._written
+
+    def _sync(self, sequence):
+        """Returns once the journal is fsync'd up to ``sequence``, syncing for everyone waiting"""
+        if self._synced >= sequence:
+            return
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return
+            with self._lock:
+                target = self._written
+                fd = self._journal.fileno()
+            os.fsync(fd)
+            self._synced = target
+
+    def _truncate_journal(self):
+        """Drops the journal once every journaled update is committed (caller holds the lock)"""
+        if self._pending or self._journal is None:
+            return
+        # Remove antes de fechar: o lock só é liberado quando o arquivo já não existe
+        os.remove(self._journal_path)
+        self._journal.close()
+        self._journal = self._journal_path = None
+        self._synced = self._written
+
+    def _dead_letter(self, item, error, attempts):
+        # A submissão já foi confirmada ao cliente: precisa de atenção manual
+        logger.error('Submissão da sessão %s descartada após %d tentativa(s): %s',
+                     item['session_id'], attempts, error)
+        with self._lock:
+            self._dead_lettered += 1
+        if not self.journal_dir:
+            return
+        with open(os.path.join(self.journal_dir, DEAD_LETTER_NAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'item': item, 'error': str(error)}, separators=(',', ':')) + '\n')
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Agrupa o que chegar durante a janela, até o tamanho máximo do lote
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _try_apply(self, items):
+        """Applies ``items`` in one transaction; returns the error, or ``None`` on success"""
+        try:
+            with self.app.app_context():
+                self._apply(items)
+        except Exception as e:
+            logger.exception('Falha ao gravar lote de %d submissões', len(items))
+            return e
+        return None
+
+    def _apply_each(self, items, attempts):
+        """Applies ``items`` one at a time, dead-lettering those that keep failing"""
+        for item in items:
+            for attempt in range(attempts):
+                if attempt:
+                    time.sleep(RETRY_DELAY)
+                error = self._try_apply([item])
+                if error is None:
+                    break
+            else:
+                self._dead_letter(item, error, attempts)
+
+    def _write_batch(self, batch):
+        if self._try_apply(batch) is not None:
+            # Uma atualização inválida não bloqueia as demais: regrava uma a uma
+            self._apply_each(batch, self.max_attempts)
+
+        with self._lock:
+            for item in batch:
+                if self._pending.get(item['session_id']) is item:
+                    del self._pending[item['session_id']]
+            self._truncate_journal()
+        for _ in batch:
+            self._slots.release()
+
+    def _apply(self, items):
+        """Writes journaled updates in one transaction (last update per session wins).
+
+        The histogram deltas come from the stored sessions, read in the same
+        transaction: an update whose ``completed_at`` is already stored was
+        committed before (a replay), so it does not count again.
+        """
+        latest = {item['session_id']: item for item in items}
+        rows = [dict(_decode(item['values']), id=session_id) for session_id, item in latest.items()]
+        certifications = set()
+        try:
+            stored = {
+                session_id: (certification, score, completed_at)
+                for session_id, certification, score, completed_at in db.session.query(
+                    SimulationSession.id, SimulationSession.certification,
+                    SimulationSession.score, SimulationSession.completed_at
+                ).filter(SimulationSession.id.in_(latest))
+            }
+            histogram_rows = []
+            for row in rows:
+                if row['id'] not in stored:
+                    continue
+                certification, score, completed_at = stored[row['id']]
+                certifications.add(certification)
+                if completed_at is not None and completed_at == row.get('completed_at'):
+                    continue
+                histogram_rows.extend(score_histogram.deltas(
+                    certification, row['score'], score if completed_at is not None else None
+                ))
+            db.session.execute(update(SimulationSession), rows)
+            session_answers.store(
+                list(latest), [answer for item in latest.values() for answer in item.get('answers', ())]
+            )
+            domain_scores.store(
+                list(latest), [score for item in latest.values() for score in item.get('scores', ())]
+            )
+            score_histogram.apply(histogram_rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+        for certification in certifications:
+            route_cache.invalidate_tag(f'sessions:{certification}')
+
+    def replay(self, path):
+        """Applies the updates left in a journal by a previous run"""
+        with open(path, encoding='utf-8') as f:
+            items = []
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    # Última linha incompleta: a submissão nunca foi confirmada ao cliente
+                    break
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            if self._try_apply(batch) is not None:
+                self._apply_each(batch, 1)
+        if items:
+            logger.info('%d submissões reaplicadas de %s', len(items), path)
+        return len(items)
+
+    def replay_orphans(self):
+        """Replays and removes the journals no live process holds"""
+        replayed = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not (name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX)):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                f = open(path, 'a', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            with f:
+                # Journal de um worker vivo (ou já reaplicado por outro processo)
+                if not self._lock_current(f, path, blocking=False):
+                    continue
+                replayed += self.replay(path)
+                os.remove(path)
+        return replayed
+
+    def dead_letter_count(self):
+        """Updates in the dead-letter file, from every process sharing the journal directory"""
+        if not self.journal_dir:
+            return 0
+        try:
+            with open(os.path.join(self.journal_dir, DEAD_LETTER_NAME), 'rb') as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+    def stats(self):
+        with self._lock:
+            pending, dead_lettered = len(self._pending), self._dead_lettered
+        return {
+            'enabled': self.enabled,
+            'pending': pending,
+            'dead_lettered': dead_lettered,
+            'dead_letter_total': self.dead_letter_count()
+        }
+
+    def shutdown(self, timeout=10):
+        """Flushes the queue before the process exits"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+submission_queue = SubmissionQueue()
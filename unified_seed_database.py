@@ -18,6 +18,11 @@ Usage:
 Options:
     --cert CERT     Seed only specific certification (CLF-C02, AIF-C01, SAA-C03, SAP-C02)
     --reset         Clear existing questions before seeding
+    --parallel [N]  Generate and validate sources on N worker processes
+    --pack PATH     Seed from a question pack file instead of the Python sources
+    --export-pack PATH
+                    Write the Python sources to a question pack file and exit
+    --snapshot PATH After seeding, write an optimized read-only snapshot of the question bank
     --verbose       Enable verbose output
     --help          Show this help message
 
@@ -25,26 +30,47 @@ Examples:
     python unified_seed_database.py                    # Seed all certifications
     python unified_seed_database.py --cert CLF-C02     # Seed only CLF-C02
     python unified_seed_database.py --reset            # Clear DB and seed all
+    python unified_seed_database.py --parallel 4       # Seed all using 4 worker processes
+    python unified_seed_database.py --export-pack questions.qpak
+    python unified_seed_database.py --pack questions.qpak
+    python unified_seed_database.py --reset --snapshot questions.db
 """
 
 import os
 import sys
 import json
 import argparse
+import hashlib
+import itertools
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from sqlalchemy import insert, update
+
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.models.user import db
-from src.models.question import Question, SimulationSession
+from src.models.question import Question, SimulationSession, QuestionExposure, SeedManifest, SessionAnswer, SessionDomainScore, QuestionCalibration, CalibratedSession, CalibrationRun, ScoreHistogramBin
+from src.services.question_import import normalize_answers, normalize_record, text_hash, ImportRecordError
+from src.services.question_pack import QuestionPack, write_pack
+from src.services.question_snapshot import build_snapshot
+from src.services.results_cache import results_cache
 from src.main import app
 
+# Number of questions checked and written per transaction
+CHUNK_SIZE = 500
+
 class UnifiedDatabaseSeeder:
     def __init__(self, verbose=False):
         self.verbose = verbose
         self.added_count = 0
+        self.updated_count = 0
+        self.deleted_count = 0
         self.existing_count = 0
+        self.skipped_sources = 0
         self.error_count = 0
         
     def log(self, message, level="INFO"):
@@ -58,13 +84,11 @@ class UnifiedDatabaseSeeder:
             self.log(message, "DEBUG")
     
     def get_clf_c02_questions(self):
-        """Generate CLF-C02 questions from all sources"""
-        questions = []
-        
+        """Yield CLF-C02 questions from all sources"""
         # Questions from generate_300_questions.py - 100 questions distributed across domains
         # Cloud Concepts (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "CLF-C02",
                 "domain": "Cloud Concepts",
                 "question_text": f"Uma empresa está avaliando migração para nuvem. Questão {i+1}: Qual é o benefício de {['elasticidade', 'agilidade', 'economia de escala', 'alcance global', 'alta disponibilidade'][i%5]} na AWS?",
@@ -78,11 +102,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": [str(i%4)],
                 "explanation": f"Explicação detalhada sobre {['elasticidade', 'agilidade', 'economia de escala', 'alcance global', 'alta disponibilidade'][i%5]} como benefício fundamental da computação em nuvem AWS.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Security and Compliance (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "CLF-C02",
                 "domain": "Security and Compliance",
                 "question_text": f"Questão de Segurança {i+1}: Como implementar {['MFA', 'IAM Roles', 'CloudTrail', 'GuardDuty', 'Shield'][i%5]} para melhorar a postura de segurança?",
@@ -96,11 +120,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": [str(i%4)],
                 "explanation": f"Explicação sobre implementação adequada de {['MFA', 'IAM Roles', 'CloudTrail', 'GuardDuty', 'Shield'][i%5]} seguindo melhores práticas de segurança AWS.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Technology (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "CLF-C02",
                 "domain": "Technology",
                 "question_text": f"Questão de Tecnologia {i+1}: Uma aplicação precisa de {['armazenamento de objetos', 'banco relacional', 'computação serverless', 'CDN global', 'DNS gerenciado'][i%5]}. Qual serviço AWS é mais apropriado?",
@@ -114,11 +138,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"Amazon {['S3', 'RDS', 'Lambda', 'CloudFront', 'Route 53'][i%5]} é o serviço mais apropriado para {['armazenamento de objetos', 'banco relacional', 'computação serverless', 'CDN global', 'DNS gerenciado'][i%5]} devido às suas características específicas.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Billing and Pricing (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "CLF-C02",
                 "domain": "Billing and Pricing",
                 "question_text": f"Questão de Billing {i+1}: Para otimizar custos de {['instâncias EC2', 'armazenamento S3', 'transferência de dados', 'banco RDS', 'Lambda executions'][i%5]}, qual estratégia é mais eficaz?",
@@ -132,10 +156,10 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": [str(i%4)],
                 "explanation": f"Para otimizar custos de {['instâncias EC2', 'armazenamento S3', 'transferência de dados', 'banco RDS', 'Lambda executions'][i%5]}, a estratégia mais eficaz considera padrões de uso e características específicas do serviço.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Questions from generate_clf_questions.py
-        questions.extend([
+        yield from [
             {
                 "certification": "CLF-C02",
                 "domain": "Cloud Concepts",
@@ -361,10 +385,10 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Alta disponibilidade refere-se à capacidade de um sistema permanecer operacional por longos períodos, minimizando o tempo de inatividade. A AWS oferece múltiplas AZs e regiões para implementar arquiteturas altamente disponíveis.",
                 "difficulty": "medium"
             }
-        ])
+        ]
         
         # Additional questions from generate_additional_questions.py
-        questions.extend([
+        yield from [
             {
                 "certification": "CLF-C02",
                 "domain": "Technology",
@@ -442,10 +466,10 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Amazon SQS é ideal para processamento assíncrono de mensagens, oferecendo durabilidade, escalabilidade e garantia de entrega. É o serviço padrão para desacoplar componentes de aplicações.",
                 "difficulty": "easy"
             }
-        ])
+        ]
         
         # Additional questions from generate_300_questions.py pattern
-        questions.extend([
+        yield from [
             {
                 "certification": "CLF-C02",
                 "domain": "Cloud Concepts",
@@ -506,18 +530,14 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Para workloads previsíveis com horários específicos, Scheduled Reserved Instances ou automação para iniciar/parar recursos oferece maior economia de custos.",
                 "difficulty": "medium"
             }
-        ])
-        
-        return questions
+        ]
     
     def get_aif_c01_questions(self):
-        """Generate AIF-C01 questions from all sources"""
-        questions = []
-        
+        """Yield AIF-C01 questions from all sources"""
         # Questions from generate_300_questions.py - 100 questions distributed across domains
         # Fundamentals of AI and ML (35 questions)
         for i in range(35):
-            questions.append({
+            yield {
                 "certification": "AIF-C01",
                 "domain": "Fundamentals of AI and ML",
                 "question_text": f"Questão AI Fundamentals {i+1}: Qual é a principal diferença entre {['supervised learning', 'unsupervised learning', 'reinforcement learning', 'deep learning', 'transfer learning'][i%5]} e outros tipos de aprendizado?",
@@ -531,11 +551,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"A principal característica de {['supervised learning', 'unsupervised learning', 'reinforcement learning', 'deep learning', 'transfer learning'][i%5]} é o uso de {['dados rotulados', 'dados não rotulados', 'sistema de recompensas', 'redes neurais profundas', 'modelos pré-treinados'][i%5]}, diferenciando-o dos outros tipos de aprendizado.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # AI and ML Services on AWS (40 questions)
         for i in range(40):
-            questions.append({
+            yield {
                 "certification": "AIF-C01",
                 "domain": "AI and ML Services on AWS",
                 "question_text": f"Questão AWS AI Services {i+1}: Uma empresa precisa implementar {['reconhecimento de imagens', 'análise de sentimentos', 'extração de texto', 'tradução automática', 'síntese de voz', 'transcrição de áudio'][i%6]}. Qual serviço AWS é mais apropriado?",
@@ -549,11 +569,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"Amazon {['Rekognition', 'Comprehend', 'Textract', 'Translate', 'Polly', 'Transcribe'][i%6]} é especificamente projetado para {['reconhecimento de imagens', 'análise de sentimentos', 'extração de texto', 'tradução automática', 'síntese de voz', 'transcrição de áudio'][i%6]}, oferecendo APIs prontas para uso.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Responsible AI (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "AIF-C01",
                 "domain": "Responsible AI",
                 "question_text": f"Questão Responsible AI {i+1}: Como garantir {['transparência', 'fairness', 'accountability', 'privacy', 'explainability'][i%5]} em sistemas de AI?",
@@ -567,10 +587,10 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": [str(i%4)],
                 "explanation": f"Para garantir {['transparência', 'fairness', 'accountability', 'privacy', 'explainability'][i%5]} em AI, é essencial implementar práticas que promovam confiança e responsabilidade no desenvolvimento e deployment de sistemas inteligentes.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Additional questions from generate_additional_questions.py
-        questions.extend([
+        yield from [
             {
                 "certification": "AIF-C01",
                 "domain": "AI and ML Services on AWS",
@@ -616,18 +636,14 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Amazon Textract usa OCR (Optical Character Recognition) e machine learning para extrair texto, tabelas e dados de documentos escaneados e PDFs com alta precisão.",
                 "difficulty": "easy"
             }
-        ])
-        
-        return questions
+        ]
     
     def get_saa_c03_questions(self):
-        """Generate SAA-C03 questions from all sources"""
-        questions = []
-        
+        """Yield SAA-C03 questions from all sources"""
         # Questions from generate_300_questions.py - 100 questions distributed across domains
         # Design Resilient Architectures (30 questions)
         for i in range(30):
-            questions.append({
+            yield {
                 "certification": "SAA-C03",
                 "domain": "Design Resilient Architectures",
                 "question_text": f"Questão Resilient Architecture {i+1}: Para garantir alta disponibilidade de {['aplicação web crítica', 'banco de dados transacional', 'API de pagamentos', 'sistema de autenticação'][i%4]}, qual arquitetura é mais apropriada?",
@@ -641,11 +657,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"Para alta disponibilidade de {['aplicação web crítica', 'banco de dados transacional', 'API de pagamentos', 'sistema de autenticação'][i%4]}, arquitetura Multi-AZ com {['Load Balancer', 'RDS Multi-AZ', 'API Gateway', 'Cognito Multi-Region'][i%4]} oferece redundância automática.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Design High-Performing Architectures (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "SAA-C03",
                 "domain": "Design High-Performing Architectures",
                 "question_text": f"Questão Performance {i+1}: Para otimizar performance de {['consultas de banco', 'entrega de conteúdo', 'processamento de dados', 'APIs REST'][i%4]}, qual solução é mais eficaz?",
@@ -659,11 +675,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"Para otimizar performance de {['consultas de banco', 'entrega de conteúdo', 'processamento de dados', 'APIs REST'][i%4]}, {['ElastiCache', 'CloudFront', 'EMR', 'API Gateway Caching'][i%4]} oferece a solução mais eficaz e direta.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Design Secure Architectures (25 questions)
         for i in range(25):
-            questions.append({
+            yield {
                 "certification": "SAA-C03",
                 "domain": "Design Secure Architectures",
                 "question_text": f"Questão Security {i+1}: Para implementar segurança em {['VPC networking', 'data encryption', 'access control', 'application security'][i%4]}, qual abordagem é mais robusta?",
@@ -677,11 +693,11 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": ["A"],
                 "explanation": f"Para segurança robusta em {['VPC networking', 'data encryption', 'access control', 'application security'][i%4]}, usar {['Security Groups + NACLs', 'KMS + CloudHSM', 'IAM Policies + Roles', 'WAF + Shield'][i%4]} fornece proteção em múltiplas camadas.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Design Cost-Optimized Architectures (20 questions)
         for i in range(20):
-            questions.append({
+            yield {
                 "certification": "SAA-C03",
                 "domain": "Design Cost-Optimized Architectures",
                 "question_text": f"Questão Cost Optimization {i+1}: Para reduzir custos de {['compute workloads', 'storage solutions', 'data transfer', 'monitoring services'][i%4]}, qual estratégia oferece maior economia?",
@@ -695,10 +711,10 @@ class UnifiedDatabaseSeeder:
                 "correct_answers": [str(i%4)],
                 "explanation": f"Para otimização de custos em {['compute workloads', 'storage solutions', 'data transfer', 'monitoring services'][i%4]}, a estratégia escolhida deve considerar padrões de uso e características específicas da carga de trabalho.",
                 "difficulty": ["easy", "medium", "hard"][i%3]
-            })
+            }
         
         # Additional questions from generate_additional_questions.py
-        questions.extend([
+        yield from [
             {
                 "certification": "SAA-C03",
                 "domain": "Design Resilient Architectures",
@@ -729,10 +745,10 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Para analytics de grandes volumes com consultas ad-hoc, S3 para armazenamento, Athena para consultas SQL serverless e Glue para ETL formam a arquitetura mais eficiente e econômica.",
                 "difficulty": "medium"
             }
-        ])
+        ]
         
         # Original questions from comprehensive questions
-        questions.extend([
+        yield from [
             {
                 "certification": "SAA-C03",
                 "domain": "Design Resilient Architectures",
@@ -808,16 +824,12 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Snapshots automatizados a cada hora garantem RPO de 1 hora, e procedures de restore bem definidos podem atender RTO de 4 horas.",
                 "difficulty": "hard"
             }
-        ])
-        
-        return questions
+        ]
     
     def get_sap_c02_questions(self):
-        """Generate SAP-C02 questions from all sources"""
-        questions = []
-        
+        """Yield SAP-C02 questions from all sources"""
         # Additional questions from generate_additional_questions.py
-        questions.extend([
+        yield from [
             {
                 "certification": "SAP-C02",
                 "domain": "Design Solutions for Organizational Complexity",
@@ -848,10 +860,10 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Para alta throughput e baixa latência em IoT, Kinesis Data Streams ingere dados em tempo real, Kinesis Analytics processa streams, e ElastiCache fornece acesso de baixa latência.",
                 "difficulty": "hard"
             }
-        ])
+        ]
         
         # Original questions from comprehensive questions
-        questions.extend([
+        yield from [
             {
                 "certification": "SAP-C02",
                 "domain": "Design Solutions for Organizational Complexity",
@@ -928,13 +940,11 @@ class UnifiedDatabaseSeeder:
                 "explanation": "Modernização com microserviços permite escalabilidade independente, melhor manutenibilidade e uso de serviços gerenciados AWS, resolvendo problemas de arquiteturas monolíticas.",
                 "difficulty": "hard"
             }
-        ])
-        
-        return questions
+        ]
     
     def get_sample_questions(self):
-        """Get sample questions from populate_questions.py and init_db.py"""
-        return [
+        """Yield sample questions from populate_questions.py and init_db.py"""
+        yield from [
             {
                 "certification": "CLF-C02",
                 "domain": "Billing, Pricing, and Support",
@@ -1135,8 +1145,8 @@ class UnifiedDatabaseSeeder:
         ]
     
     def get_additional_questions(self):
-        """Get additional practical questions"""
-        return [
+        """Yield additional practical questions"""
+        yield from [
             {
                 "certification": "CLF-C02",
                 "domain": "Technology",
@@ -1186,51 +1196,309 @@ class UnifiedDatabaseSeeder:
     
     def normalize_answers(self, answers):
         """Normalize answers to ensure consistency"""
-        if isinstance(answers, list):
-            return answers
-        elif isinstance(answers, str):
-            return [answers]
-        else:
-            return [str(answers)]
+        return normalize_answers(answers)
+    
+    def question_sources(self):
+        """Question sources as (certification, generator function) pairs.
+        
+        A certification of None marks a source that mixes certifications.
+        """
+        return [
+            ("CLF-C02", self.get_clf_c02_questions),
+            ("CLF-C02", self.get_sample_questions),
+            ("AIF-C01", self.get_aif_c01_questions),
+            ("SAA-C03", self.get_saa_c03_questions),
+            ("SAP-C02", self.get_sap_c02_questions),
+            (None, self.get_additional_questions),
+        ]
     
-    def add_questions_to_db(self, questions):
-        """Add questions to database with duplicate checking"""
+    def iter_questions(self, target_cert=None):
+        """Stream questions from every source, evaluating each source once"""
+        for certification, source in self.question_sources():
+            if target_cert and certification and certification != target_cert:
+                continue
+            self.log(f"Collecting {certification or 'mixed'} questions from {source.__name__}...")
+            for q_data in source():
+                if target_cert and q_data["certification"] != target_cert:
+                    continue
+                yield q_data
+    
+    def iter_pack_questions(self, pack_path, target_cert=None):
+        """Stream questions from a question pack, decoding records lazily"""
+        with QuestionPack(pack_path) as pack:
+            for certification in pack.certifications():
+                if target_cert and certification != target_cert:
+                    continue
+                self.log(f"Collecting {certification} questions from {pack_path}...")
+                yield from pack.iter_certification(certification)
+    
+    def export_pack(self, pack_path, target_cert=None):
+        """Convert the Python question sources into a question pack file"""
+        count = write_pack(pack_path, self.iter_questions(target_cert))
+        self.log(f"Question pack written to {pack_path}: {count} questions")
+        return count
+    
+    def iter_chunks(self, questions, size=CHUNK_SIZE):
+        """Group a question stream into lists of at most ``size`` items"""
+        iterator = iter(questions)
+        while True:
+            chunk = list(itertools.islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def iter_rows(self, questions, report_errors=True):
+        """Validate and normalize raw questions into ``questions`` table rows"""
         for q_data in questions:
             try:
-                # Check if question already exists
-                existing = Question.query.filter_by(
-                    certification=q_data["certification"],
-                    question_text=q_data["question_text"]
-                ).first()
-                
-                if not existing:
-                    # Normalize correct_answers format
-                    correct_answers = self.normalize_answers(q_data["correct_answers"])
-                    
-                    question = Question(
-                        certification=q_data["certification"],
-                        domain=q_data["domain"],
-                        question_text=q_data["question_text"],
-                        question_type=q_data["question_type"],
-                        options=json.dumps(q_data["options"]),
-                        correct_answers=json.dumps(correct_answers),
-                        explanation=q_data["explanation"],
-                        difficulty=q_data["difficulty"]
+                yield normalize_record(q_data)
+            except ImportRecordError as e:
+                if report_errors:
+                    self.error_count += 1
+                    self.log(f"Error adding question: {str(q_data.get('question_text', ''))[:60]}: {e}", "ERROR")
+    
+    def row_checksum(self, row):
+        """Content checksum of one normalized question row"""
+        return hashlib.sha256(json.dumps(row, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    
+    def checksums_by_certification(self, rows):
+        """Stream rows and return the content checksum of each certification"""
+        digests = {}
+        for row in rows:
+            digests.setdefault(row["certification"], hashlib.sha256()).update(self.row_checksum(row).encode("ascii"))
+        return {certification: digest.hexdigest() for certification, digest in digests.items()}
+    
+    def spool_by_certification(self, rows):
+        """Spill rows to one NDJSON temp file per certification, checksumming in the same pass
+        
+        Returns ``({certification: path}, checksums, row_count)``. Only the row
+        being written is held in memory; ``iter_spooled`` streams a file back.
+        """
+        files = {}
+        digests = {}
+        count = 0
+        try:
+            for row in rows:
+                certification = row["certification"]
+                spool = files.get(certification)
+                if spool is None:
+                    spool = files[certification] = tempfile.NamedTemporaryFile(
+                        "w", encoding="utf-8", prefix="seed-", suffix=".ndjson", delete=False
                     )
-                    db.session.add(question)
-                    self.added_count += 1
-                    self.verbose_log(f"Added [{q_data['certification']}]: {q_data['question_text'][:60]}...")
+                # Same serialization as row_checksum, so each row is encoded once
+                line = json.dumps(row, sort_keys=True, ensure_ascii=False)
+                spool.write(line + "\n")
+                digests.setdefault(certification, hashlib.sha256()).update(
+                    hashlib.sha256(line.encode("utf-8")).hexdigest().encode("ascii")
+                )
+                count += 1
+        except BaseException:
+            for spool in files.values():
+                spool.close()
+            self.remove_spool({certification: spool.name for certification, spool in files.items()})
+            raise
+        for spool in files.values():
+            spool.close()
+        paths = {certification: spool.name for certification, spool in files.items()}
+        return paths, {certification: digest.hexdigest() for certification, digest in digests.items()}, count
+    
+    def iter_spooled(self, paths, certification):
+        """Stream back the rows spooled for a certification"""
+        if certification not in paths:
+            return
+        with open(paths[certification], encoding="utf-8") as spool:
+            for line in spool:
+                yield json.loads(line)
+    
+    def remove_spool(self, paths):
+        for path in paths.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def sync_source(self, source_name, checksums, rows_for, target_cert=None):
+        """Apply one source, skipping it entirely when its checksums match the manifest
+        
+        ``rows_for(certification)`` returns the normalized rows of a certification
+        and is only called for certifications whose content changed.
+        """
+        manifest = {row.certification: row for row in SeedManifest.query.filter_by(source=source_name)}
+        
+        # Certifications that disappeared from the source must have their questions removed
+        for certification in manifest:
+            if certification not in checksums and (not target_cert or certification == target_cert):
+                checksums[certification] = hashlib.sha256().hexdigest()
+        
+        changed = [
+            certification for certification, checksum in checksums.items()
+            if certification not in manifest or manifest[certification].checksum != checksum
+        ]
+        if not changed:
+            self.skipped_sources += 1
+            self.log(f"{source_name}: unchanged, skipped")
+            return
+        
+        for certification in changed:
+            self.log(f"{source_name}: syncing {certification}...")
+            self.sync_certification(
+                source_name, certification, rows_for(certification), checksums[certification], manifest.get(certification)
+            )
+    
+    def sync_certification(self, source_name, certification, rows, checksum, manifest_row):
+        """Insert, update and delete the questions of one source/certification pair"""
+        existing = {
+            text_hash(question_text): question_id
+            for question_id, question_text in db.session.query(Question.id, Question.question_text)
+            .filter(Question.certification == certification)
+        }
+        # Without a previous manifest, existing questions are kept as they are
+        old_entries = json.loads(manifest_row.entries) if manifest_row else None
+        new_entries = {}
+        
+        for chunk in self.iter_chunks(rows):
+            inserts = []
+            updates = []
+            for row in chunk:
+                key = text_hash(row["question_text"])
+                if key in new_entries:
+                    self.existing_count += 1
+                    continue
+                new_entries[key] = self.row_checksum(row)
+                
+                if key not in existing:
+                    inserts.append(row)
+                    existing[key] = None
+                    self.verbose_log(f"Added [{certification}]: {row['question_text'][:60]}...")
+                elif old_entries is not None and existing[key] and old_entries.get(key) != new_entries[key]:
+                    updates.append(dict(row, id=existing[key]))
+                    self.verbose_log(f"Updated [{certification}]: {row['question_text'][:60]}...")
                 else:
                     self.existing_count += 1
-                    self.verbose_log(f"Exists [{q_data['certification']}]: {q_data['question_text'][:60]}...")
-                    
-            except Exception as e:
-                self.error_count += 1
-                self.log(f"Error adding question: {str(e)}", "ERROR")
+            
+            if inserts:
+                db.session.execute(insert(Question), inserts)
+            if updates:
+                db.session.execute(update(Question), updates)
+            db.session.commit()
+            self.added_count += len(inserts)
+            self.updated_count += len(updates)
+        
+        if old_entries:
+            # Questions dropped from this source, unless another source still provides them
+            owned_elsewhere = set()
+            for other in SeedManifest.query.filter(
+                SeedManifest.certification == certification, SeedManifest.source != source_name
+            ):
+                owned_elsewhere.update(json.loads(other.entries))
+            stale_ids = [
+                existing[key] for key in old_entries
+                if key not in new_entries and key not in owned_elsewhere and existing.get(key)
+            ]
+            for chunk in self.iter_chunks(stale_ids):
+                Question.query.filter(Question.id.in_(chunk)).delete(synchronize_session=False)
+            self.deleted_count += len(stale_ids)
+        
+        if manifest_row is None:
+            manifest_row = SeedManifest(source=source_name, certification=certification)
+            db.session.add(manifest_row)
+        manifest_row.checksum = checksum
+        manifest_row.question_count = len(new_entries)
+        manifest_row.entries = json.dumps(new_entries, sort_keys=True)
+        db.session.commit()
+    
+    def seed_sources(self, target_cert=None):
+        """Checksum each Python source and sync only the ones that changed
+        
+        Each source is evaluated once: its rows are spooled to temp files per
+        certification while the checksums are computed, and the changed
+        certifications are synced by streaming those files back.
+        """
+        for certification, source in self.question_sources():
+            if target_cert and certification and certification != target_cert:
                 continue
+            self.log(f"Collecting {certification or 'mixed'} questions from {source.__name__}...")
+            
+            records = (q_data for q_data in source() if not target_cert or q_data["certification"] == target_cert)
+            paths, checksums, _ = self.spool_by_certification(self.iter_rows(records))
+            try:
+                self.sync_source(
+                    source.__name__,
+                    checksums,
+                    lambda cert, paths=paths: self.iter_spooled(paths, cert),
+                    target_cert
+                )
+            finally:
+                self.remove_spool(paths)
     
-    def seed_database(self, target_cert=None, reset=False):
+    def seed_pack(self, pack_path, target_cert=None):
+        """Sync questions from a question pack, one certification at a time"""
+        source_name = f"pack:{os.path.basename(pack_path)}"
+        with QuestionPack(pack_path) as pack:
+            certifications = [c for c in pack.certifications() if not target_cert or c == target_cert]
+            self.log(f"Collecting questions from {pack_path}...")
+            checksums = {}
+            for certification in certifications:
+                checksums.update(self.checksums_by_certification(
+                    self.iter_rows(pack.iter_certification(certification), report_errors=False)
+                ))
+            self.sync_source(
+                source_name,
+                checksums,
+                lambda cert: self.iter_rows(pack.iter_certification(cert)),
+                target_cert
+            )
+    
+    def seed_parallel(self, target_cert=None, workers=None):
+        """Generate and validate sources on a process pool; this process is the only writer"""
+        sources = [
+            (certification, source.__name__)
+            for certification, source in self.question_sources()
+            if not (target_cert and certification and certification != target_cert)
+        ]
+        pending = Counter(certification or "mixed" for certification, _ in sources)
+        written = Counter()
+        workers = workers or os.cpu_count() or 1
+        self.log(f"Generating {len(sources)} sources on {workers} worker processes...")
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(generate_source, source_name, target_cert): (certification or "mixed", source_name)
+                for certification, source_name in sources
+            }
+            
+            # Generation runs in parallel, but sources are written in question_sources() order
+            # so question ids are the same on every run
+            try:
+                for future, (label, source_name) in futures.items():
+                    paths, checksums, count, errors = future.result()
+                    
+                    for message in errors:
+                        self.error_count += 1
+                        self.log(f"Error adding question: {message}", "ERROR")
+                    
+                    try:
+                        self.sync_source(source_name, checksums, lambda cert: self.iter_spooled(paths, cert), target_cert)
+                    finally:
+                        self.remove_spool(paths)
+                    written[label] += count
+                    pending[label] -= 1
+                    if pending[label] == 0:
+                        self.log(f"{label} completed: {written[label]} questions processed")
+            except BaseException:
+                # Remove the spools of sources that were generated but never written
+                for future in futures:
+                    future.cancel()
+                for future in futures:
+                    if not future.cancelled() and future.exception() is None:
+                        self.remove_spool(future.result()[0])
+                raise
+    
+    def seed_database(self, target_cert=None, reset=False, parallel=None, pack_path=None):
         """Main seeding function"""
+        if app.config['QUESTION_BANK_SNAPSHOT']:
+            raise RuntimeError("QUESTION_BANK_SNAPSHOT is set: the question bank is read-only, unset it to seed")
+        
         with app.app_context():
             # Create tables if they don't exist
             db.create_all()
@@ -1239,56 +1507,55 @@ class UnifiedDatabaseSeeder:
             # Reset database if requested
             if reset:
                 self.log("Resetting database...")
-                Question.query.delete()
+                # One transaction per bind: both may point at the same SQLite file
                 SimulationSession.query.delete()
+                SessionAnswer.query.delete()
+                SessionDomainScore.query.delete()
+                QuestionCalibration.query.delete()
+                CalibratedSession.query.delete()
+                CalibrationRun.query.delete()
+                ScoreHistogramBin.query.delete()
+                QuestionExposure.query.delete()
                 db.session.commit()
+                Question.query.delete()
+                SeedManifest.query.delete()
+                db.session.commit()
+                # Ids de sessão são reutilizados: resultados em cache das sessões apagadas saem junto
+                results_cache.clear()
                 self.log("Database reset completed")
             
-            # Collect all questions
-            all_questions = []
-            
-            if not target_cert or target_cert == "CLF-C02":
-                self.log("Collecting CLF-C02 questions...")
-                all_questions.extend(self.get_clf_c02_questions())
-                all_questions.extend(self.get_sample_questions())
-                all_questions.extend([q for q in self.get_additional_questions() if q["certification"] == "CLF-C02"])
-            
-            if not target_cert or target_cert == "AIF-C01":
-                self.log("Collecting AIF-C01 questions...")
-                all_questions.extend(self.get_aif_c01_questions())
-                all_questions.extend([q for q in self.get_additional_questions() if q["certification"] == "AIF-C01"])
-            
-            if not target_cert or target_cert == "SAA-C03":
-                self.log("Collecting SAA-C03 questions...")
-                all_questions.extend(self.get_saa_c03_questions())
-                all_questions.extend([q for q in self.get_additional_questions() if q["certification"] == "SAA-C03"])
-            
-            if not target_cert or target_cert == "SAP-C02":
-                self.log("Collecting SAP-C02 questions...")
-                all_questions.extend(self.get_sap_c02_questions())
-            
-            self.log(f"Total questions collected: {len(all_questions)}")
-            
-            # Add questions to database
-            self.log("Adding questions to database...")
-            self.add_questions_to_db(all_questions)
-            
-            # Commit changes
-            db.session.commit()
+            if pack_path:
+                self.seed_pack(pack_path, target_cert)
+            elif parallel:
+                self.seed_parallel(target_cert, workers=parallel)
+            else:
+                self.seed_sources(target_cert)
             self.log("Database changes committed")
             
             # Print statistics
             self.print_statistics()
     
+    def build_snapshot(self, snapshot_path):
+        """Write the seeded question bank to a vacuumed, analyzed and indexed snapshot file"""
+        with app.app_context():
+            source_path = db.engines["questions"].url.database
+        self.log(f"Building question bank snapshot {snapshot_path}...")
+        count = build_snapshot(source_path, snapshot_path)
+        size = os.path.getsize(snapshot_path)
+        self.log(f"Snapshot written: {count} questions, {size / 1024:.0f} KiB")
+    
     def print_statistics(self):
         """Print final statistics"""
         print(f"\n{'='*80}")
         print(f"🚀 DATABASE SEEDING COMPLETED!")
         print(f"{'='*80}")
         print(f"📊 Questions added: {self.added_count}")
+        print(f"📊 Questions updated: {self.updated_count}")
+        print(f"📊 Questions deleted: {self.deleted_count}")
         print(f"📊 Questions already existing: {self.existing_count}")
+        print(f"📊 Unchanged sources skipped: {self.skipped_sources}")
         print(f"📊 Errors encountered: {self.error_count}")
-        print(f"📊 Total processed: {self.added_count + self.existing_count + self.error_count}")
+        print(f"📊 Total processed: {self.added_count + self.updated_count + self.existing_count + self.error_count}")
         
         # Count by certification
         print(f"\n{'='*80}")
@@ -1306,6 +1573,24 @@ class UnifiedDatabaseSeeder:
         print(f"✅ SUCCESS: Database seeding completed successfully!")
         print(f"{'='*80}")
 
+def generate_source(source_name, target_cert=None):
+    """Worker process: run one question source, validate, checksum and spool its records"""
+    seeder = UnifiedDatabaseSeeder()
+    errors = []
+    
+    def valid_rows():
+        for q_data in getattr(seeder, source_name)():
+            if target_cert and q_data["certification"] != target_cert:
+                continue
+            try:
+                yield normalize_record(q_data)
+            except ImportRecordError as e:
+                errors.append(f"{str(q_data.get('question_text', ''))[:60]}: {e}")
+    
+    # Rows travel back through temp files, not pickled through the pool
+    paths, checksums, count = seeder.spool_by_certification(valid_rows())
+    return paths, checksums, count, errors
+
 def main():
     """Main function with command line argument parsing"""
     parser = argparse.ArgumentParser(
@@ -1316,6 +1601,10 @@ Examples:
     python unified_seed_database.py                    # Seed all certifications
     python unified_seed_database.py --cert CLF-C02     # Seed only CLF-C02
     python unified_seed_database.py --reset            # Clear DB and seed all
+    python unified_seed_database.py --parallel 4       # Seed all using 4 worker processes
+    python unified_seed_database.py --export-pack questions.qpak
+    python unified_seed_database.py --pack questions.qpak
+    python unified_seed_database.py --reset --snapshot questions.db
     python unified_seed_database.py --verbose          # Enable verbose output
         """
     )
@@ -1332,6 +1621,33 @@ Examples:
         help='Clear existing questions before seeding'
     )
     
+    parser.add_argument(
+        '--parallel',
+        nargs='?',
+        type=int,
+        const=os.cpu_count() or 1,
+        metavar='N',
+        help='Generate and validate sources on N worker processes (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--pack',
+        metavar='PATH',
+        help='Seed from a question pack file instead of the Python sources'
+    )
+    
+    parser.add_argument(
+        '--export-pack',
+        metavar='PATH',
+        help='Write the Python question sources to a question pack file and exit'
+    )
+    
+    parser.add_argument(
+        '--snapshot',
+        metavar='PATH',
+        help='After seeding, write an optimized read-only snapshot of the question bank to PATH'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -1343,6 +1659,10 @@ Examples:
     # Create seeder instance
     seeder = UnifiedDatabaseSeeder(verbose=args.verbose)
     
+    if args.export_pack:
+        seeder.export_pack(args.export_pack, target_cert=args.cert)
+        return
+    
     # Welcome message
     print(f"{'='*80}")
     print(f"🚀 AWS SIMULADOS - UNIFIED DATABASE SEEDER")
@@ -1357,6 +1677,11 @@ Examples:
     if args.reset:
         print(f"⚠️  Reset mode: ENABLED (will clear existing questions)")
     
+    if args.pack:
+        print(f"📦 Question pack: {args.pack}")
+    elif args.parallel:
+        print(f"⚡ Parallel mode: ENABLED ({args.parallel} workers)")
+    
     if args.verbose:
         print(f"🔍 Verbose mode: ENABLED")
     
@@ -1364,7 +1689,9 @@ Examples:
     
     # Run seeding
     try:
-        seeder.seed_database(target_cert=args.cert, reset=args.reset)
+        seeder.seed_database(target_cert=args.cert, reset=args.reset, parallel=args.parallel, pack_path=args.pack)
+        if args.snapshot:
+            seeder.build_snapshot(args.snapshot)
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
         sys.exit(1)